@@ -0,0 +1,99 @@
+import asyncio
+import weakref
+
+from cassandra.cqlengine import connection
+
+from app import db
+from app.config import get_settings
+
+settings = get_settings()
+
+# loop -> Semaphore; asyncio primitives belong to the loop they are used on.
+_in_flight = weakref.WeakKeyDictionary()
+
+
+class _PagedResult:
+    """
+    Collects the rows of a ResponseFuture into an asyncio future: every
+    page, or with `all_pages=False` only the first.
+    """
+
+    def __init__(self, response_future, loop, all_pages=True):
+        self.response_future = response_future
+        self.loop = loop
+        self.all_pages = all_pages
+        self.future = loop.create_future()
+        self.rows = []
+        response_future.add_callbacks(self._on_page, self._on_error)
+
+    def _on_page(self, rows):
+        self.rows.extend(rows)
+        if self.all_pages and self.response_future.has_more_pages:
+            self.response_future.start_fetching_next_page()
+        else:
+            self.loop.call_soon_threadsafe(self._set_result)
+
+    def _on_error(self, exc):
+        self.loop.call_soon_threadsafe(self._set_exception, exc)
+
+    def _set_result(self):
+        if not self.future.done():
+            self.future.set_result(self.rows)
+
+    def _set_exception(self, exc):
+        if not self.future.done():
+            self.future.set_exception(exc)
+
+
+def wrap_future(response_future, loop=None, all_pages=True):
+    """
+    Return an asyncio future for a driver ResponseFuture. The driver calls
+    back from its own IO thread, so the result is handed to `loop` with
+    call_soon_threadsafe.
+    """
+    loop = loop or asyncio.get_running_loop()
+    return _PagedResult(response_future, loop, all_pages=all_pages).future
+
+
+def _limit():
+    """
+    The in-flight request cap of the running loop. The driver keeps one
+    multiplexed connection per host, so bursts beyond this would only
+    queue inside it and time out there instead of waiting here.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = _in_flight.get(loop)
+    if semaphore is None:
+        semaphore = _in_flight[loop] = asyncio.Semaphore(settings.db_max_concurrent_requests)
+    return semaphore
+
+
+async def execute(query, params=None, **kwargs):
+    """
+    Run `query` without blocking the event loop and return all rows.
+    Query strings are prepared once and reused; `execution_profile` picks
+    one of the profiles in `db`.
+    """
+    if isinstance(query, str):
+        query = db.prepare(query)
+    session = connection.get_session()
+    async with _limit():
+        return await wrap_future(session.execute_async(query, params, **kwargs))
+
+
+async def execute_page(query, params=None, page_size=100, paging_state=None, **kwargs):
+    """
+    Fetch one page of `query`. Returns the rows and the driver paging
+    state of the next page, which is None on the last page.
+    """
+    if isinstance(query, str):
+        query = db.prepare(query)
+    statement = query.bind(params or [])
+    statement.fetch_size = page_size
+    session = connection.get_session()
+    async with _limit():
+        response_future = session.execute_async(statement, paging_state=paging_state, **kwargs)
+        rows = await wrap_future(response_future, all_pages=False)
+    # The page is in, so result() returns at once; its ResultSet is the
+    # public way to the paging state.
+    return rows, response_future.result().paging_state
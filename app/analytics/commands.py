@@ -0,0 +1,29 @@
+import argparse
+
+from app import db
+from .rollups import rollup_all, rollup_video
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.analytics.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rollup = subparsers.add_parser(
+        "rollup", help="Fold new watch events into the per-video rollups")
+    rollup.add_argument("--host-id", default=None)
+    args = parser.parse_args(argv)
+
+    db.get_session()
+    try:
+        if args.command == "rollup":
+            if args.host_id:
+                rollup_video(args.host_id)
+                print(f"Rolled up {args.host_id}")
+            else:
+                count = rollup_all()
+                print(f"Rolled up {count} videos")
+    finally:
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
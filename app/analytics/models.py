@@ -0,0 +1,48 @@
+from cassandra.cqlengine import columns
+from cassandra.cqlengine.models import Model
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class VideoWatchRollup(Model):
+    """
+    Per-video watch aggregates maintained by `rollups.rollup_video`.
+
+    `watermark` is the newest `WatchEvent.event_id` already folded in.
+    `open_sessions` keeps the furthest position of the sessions seen in
+    the last run, keyed by "<user_id>:<start_time>", so a session that
+    spans two runs is extended rather than counted twice.
+    """
+    __keyspace__ = settings.keyspace
+    host_id = columns.Text(primary_key=True)
+    watermark = columns.TimeUUID()
+    duration = columns.Double(default=0)
+    sessions = columns.BigInt(default=0)
+    completed_sessions = columns.BigInt(default=0)
+    completion_sum = columns.Double(default=0)
+    seconds_watched = columns.Double(default=0)
+    dropoff = columns.List(value_type=columns.BigInt)
+    open_sessions = columns.Map(columns.Text, columns.Double)
+    updated = columns.DateTime()
+
+    @property
+    def completion_ratio(self):
+        return self.completed_sessions / self.sessions if self.sessions else 0.0
+
+    @property
+    def average_completion(self):
+        return self.completion_sum / self.sessions if self.sessions else 0.0
+
+    def as_data(self):
+        return {
+            "host_id": self.host_id,
+            "sessions": self.sessions,
+            "seconds_watched": self.seconds_watched,
+            "duration": self.duration,
+            "average_completion": self.average_completion,
+            "completion_ratio": self.completion_ratio,
+            "dropoff": list(self.dropoff or []),
+            "updated": self.updated,
+        }
@@ -0,0 +1,165 @@
+import datetime
+
+import numpy as np
+from cassandra.util import min_uuid_from_time, unix_time_from_uuid1
+
+from app.config import get_settings
+from app.videos.models import Video
+from app.watch_events.archive import as_uuids, scan_archives
+from app.watch_events.models import COMPLETION_THRESHOLD, WatchEvent, day_buckets
+from .models import VideoWatchRollup
+
+settings = get_settings()
+
+EVENT_FIELDS = ("event_id", "user_id", "start_time", "end_time", "duration")
+
+
+def default_cutoff():
+    return datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=settings.analytics_rollup_lag)
+
+
+def fetch_new_events(host_id, watermark=None, cutoff=None, fetch_size=5000):
+    """
+    Events of `host_id` newer than `watermark` and older than `cutoff`,
+    newest first. The cutoff leaves room for heartbeats that are still
+    sitting in a write-behind buffer.
+
+    Only the day buckets between the two are read; without a watermark
+    the last `analytics_lookback_days` days are.
+    """
+    if cutoff is None:
+        cutoff = default_cutoff()
+    if watermark is not None:
+        start = datetime.datetime.utcfromtimestamp(unix_time_from_uuid1(watermark)).date()
+    else:
+        start = cutoff.date() - datetime.timedelta(days=settings.analytics_lookback_days)
+    rows = []
+    for bucket in day_buckets(start, cutoff.date()):
+        q = WatchEvent.objects.filter(host_id=host_id, bucket=bucket)
+        if watermark is not None:
+            q = q.filter(event_id__gt=watermark)
+        q = q.filter(event_id__lt=min_uuid_from_time(cutoff))
+        rows.extend(q.limit(None).fetch_size(fetch_size).values_list(*EVENT_FIELDS))
+    return rows
+
+
+def summarize(user_ids, start_times, end_times, durations, open_sessions=None,
+              buckets=settings.analytics_dropoff_buckets):
+    """
+    Fold a batch of watch events into rollup deltas.
+
+    A session is one (user_id, start_time) pair: the player keeps
+    `start_time` fixed and advances `end_time` with every heartbeat.
+    `open_sessions` maps session keys from the previous run to the
+    furthest position already counted for them.
+    """
+    open_sessions = open_sessions or {}
+    start_times = np.asarray(start_times, dtype=np.float64)
+    end_times = np.asarray(end_times, dtype=np.float64)
+    durations = np.asarray(durations, dtype=np.float64)
+    valid = ~(np.isnan(start_times) | np.isnan(end_times))
+    start_times, end_times = start_times[valid], end_times[valid]
+    keys = np.char.add(np.char.add(np.asarray(user_ids)[valid].astype(str), ":"),
+                       start_times.astype(str))
+    session_keys, inverse = np.unique(keys, return_inverse=True)
+
+    starts = np.full(len(session_keys), np.inf)
+    np.minimum.at(starts, inverse, start_times)
+    ends = np.full(len(session_keys), -np.inf)
+    np.maximum.at(ends, inverse, end_times)
+
+    previous = np.array([open_sessions.get(key, np.nan) for key in session_keys.tolist()],
+                        dtype=np.float64)
+    continuing = ~np.isnan(previous)
+    previous = previous[continuing]
+    ends[continuing] = np.maximum(ends[continuing], previous)
+    watched_from = starts.copy()
+    watched_from[continuing] = previous
+    seconds_watched = np.clip(ends - watched_from, 0, None).sum()
+
+    durations = durations[~np.isnan(durations)]
+    duration = float(durations.max()) if len(durations) else 0.0
+    if duration > 0:
+        fractions = np.clip(ends / duration, 0, 1)
+        previous_fractions = np.clip(previous / duration, 0, 1)
+    else:
+        fractions = np.zeros(len(ends))
+        previous_fractions = np.zeros(len(previous))
+    completed = ends > duration * COMPLETION_THRESHOLD
+    previously_completed = previous > duration * COMPLETION_THRESHOLD
+
+    def histogram(values):
+        index = np.minimum((values * buckets).astype(np.int64), buckets - 1)
+        return np.bincount(index, minlength=buckets)
+
+    return {
+        "duration": duration,
+        "sessions": int((~continuing).sum()),
+        "completed_sessions": int(completed.sum() - previously_completed.sum()),
+        "completion_sum": float(fractions.sum() - previous_fractions.sum()),
+        "seconds_watched": float(seconds_watched),
+        "dropoff": histogram(fractions) - histogram(previous_fractions),
+        "open_sessions": dict(zip(session_keys.tolist(), ends.tolist())),
+    }
+
+
+def rollup_video(host_id, cutoff=None, buckets=settings.analytics_dropoff_buckets):
+    if cutoff is None:
+        cutoff = default_cutoff()
+    rollup = VideoWatchRollup.objects.filter(host_id=host_id).first()
+    if rollup is None:
+        rollup = VideoWatchRollup(host_id=host_id)
+    rows = fetch_new_events(host_id, watermark=rollup.watermark, cutoff=cutoff)
+    if not rows:
+        return rollup
+    event_ids, user_ids, start_times, end_times, durations = zip(*rows)
+    delta = summarize(user_ids, start_times, end_times, durations,
+                      open_sessions=rollup.open_sessions, buckets=buckets)
+
+    dropoff = np.zeros(buckets, dtype=np.int64)
+    previous = np.asarray(rollup.dropoff or [], dtype=np.int64)[:buckets]
+    dropoff[:len(previous)] = previous
+    rollup.dropoff = (dropoff + delta["dropoff"]).tolist()
+    rollup.duration = max(rollup.duration or 0, delta["duration"])
+    rollup.sessions = (rollup.sessions or 0) + delta["sessions"]
+    rollup.completed_sessions = (rollup.completed_sessions or 0) + delta["completed_sessions"]
+    rollup.completion_sum = (rollup.completion_sum or 0) + delta["completion_sum"]
+    rollup.seconds_watched = (rollup.seconds_watched or 0) + delta["seconds_watched"]
+    rollup.open_sessions = delta["open_sessions"]
+    rollup.watermark = event_ids[0]
+    rollup.updated = datetime.datetime.utcnow()
+    rollup.save()
+    return rollup
+
+
+def rollup_all(cutoff=None):
+    if cutoff is None:
+        cutoff = default_cutoff()
+    count = 0
+    last_host_id = None
+    for host_id in Video.objects.all().limit(None).values_list("host_id", flat=True):
+        if host_id == last_host_id:
+            continue
+        last_host_id = host_id
+        rollup_video(host_id, cutoff=cutoff)
+        count += 1
+    return count
+
+
+def summarize_archives(host_id, start=None, end=None,
+                       buckets=settings.analytics_dropoff_buckets):
+    """
+    Aggregate the archived days of `host_id` with the same rules as the
+    live rollups, for history that has already expired from the table.
+    """
+    user_ids, start_times, end_times, durations = [], [], [], []
+    for _, _, columns in scan_archives(host_id, start=start, end=end):
+        user_ids.extend(as_uuids(columns["user_id"]))
+        start_times.append(columns["start_time"])
+        end_times.append(columns["end_time"])
+        durations.append(columns["duration"])
+    if not user_ids:
+        return summarize([], [], [], [], buckets=buckets)
+    return summarize(user_ids, np.concatenate(start_times), np.concatenate(end_times),
+                     np.concatenate(durations), buckets=buckets)
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Request
+
+from app.shortcuts import get_object_or_404
+from app.users.decorators import login_required
+from .models import VideoWatchRollup
+
+router = APIRouter(
+    prefix="/api/analytics"
+)
+
+
+@router.get("/videos/{host_id}")
+@login_required
+def video_analytics_view(request: Request, host_id: str):
+    rollup = get_object_or_404(VideoWatchRollup, host_id=host_id)
+    return rollup.as_data()
@@ -10,12 +10,67 @@ os.environ['CQLENG_ALLOW_SCHEMA_MANAGEMENT'] = "1"
 class Settings(BaseSettings):
     base_dir: Path = Path(__file__).resolve().parent
     templates_dir: Path = Path(__file__).resolve().parent / "templates"
+    template_cache_dir: Path = Path(__file__).resolve().parent.parent / ".jinja_cache"
+    fragment_cache_size: int = Field(default=1000)
+    fragment_cache_ttl: float = Field(default=300.0)
     keyspace: str = Field(..., env='ASTRADB_KEYSPACE')
-    db_client_id: str = Field(..., env='ASTRADB_CLIENT_ID')
-    db_client_secret: str = Field(..., env='ASTRADB_CLIENT_SECRET')
+    db_client_id: str = Field(default="", env='ASTRADB_CLIENT_ID')
+    db_client_secret: str = Field(default="", env='ASTRADB_CLIENT_SECRET')
+    db_contact_points: str = Field(default="")
+    db_port: int = Field(default=9042)
+    db_local_dc: str = Field(default="")
+    db_connect_timeout: float = Field(default=10.0)
+    db_request_timeout: float = Field(default=10.0)
+    db_point_read_timeout: float = Field(default=2.0)
+    db_scan_timeout: float = Field(default=120.0)
+    db_heartbeat_timeout: float = Field(default=5.0)
+    db_speculative_delay: float = Field(default=0.05)
+    db_speculative_attempts: int = Field(default=2)
+    db_executor_threads: int = Field(default=2)
+    db_max_concurrent_requests: int = Field(default=1024)
+    storage_backend: str = Field(default="cassandra")
+    storage_latency: float = Field(default=0.0)
+    storage_latency_jitter: float = Field(default=0.0)
     secret_key: str = Field(...)
     jwt_algo: str = Field(default='HS256')
     session_duration: int = Field(default=86400)
+    argon2_time_cost: int = Field(default=3)
+    argon2_memory_cost: int = Field(default=65536)
+    argon2_parallelism: int = Field(default=4)
+    password_hash_workers: int = Field(default=0)
+    password_hash_queue_size: int = Field(default=0)
+    user_cache_size: int = Field(default=10000)
+    user_cache_ttl: float = Field(default=300.0)
+    email_filter_capacity: int = Field(default=1000000)
+    email_filter_error_rate: float = Field(default=0.001)
+    token_cache_size: int = Field(default=10000)
+    token_negative_ttl: float = Field(default=60.0)
+    watch_event_flush_interval: float = Field(default=2.0)
+    watch_event_flush_size: int = Field(default=1000)
+    watch_event_batch_size: int = Field(default=50)
+    list_page_size: int = Field(default=25)
+    list_cache_ttl: float = Field(default=5.0)
+    watch_event_ttl_days: int = Field(default=30)
+    watch_event_archive_after_days: int = Field(default=1)
+    archive_dir: Path = Path(__file__).resolve().parent.parent / "archive"
+    watch_socket_persist_interval: float = Field(default=30.0)
+    resume_cache_size: int = Field(default=10000)
+    resume_cache_ttl: float = Field(default=30.0)
+    video_cache_size: int = Field(default=10000)
+    video_cache_ttl: float = Field(default=300.0)
+    video_cache_negative_ttl: float = Field(default=30.0)
+    bulk_import_concurrency: int = Field(default=16)
+    bulk_import_max_rows: int = Field(default=5000)
+    playlist_page_size: int = Field(default=100)
+    playlist_progress_cache_size: int = Field(default=10000)
+    playlist_progress_cache_ttl: float = Field(default=30.0)
+    video_fetch_concurrency: int = Field(default=32)
+    search_results_limit: int = Field(default=20)
+    migrate_on_startup: bool = Field(default=False)
+    migration_lock_ttl: int = Field(default=600)
+    analytics_dropoff_buckets: int = Field(default=20)
+    analytics_rollup_lag: int = Field(default=60)
+    analytics_lookback_days: int = Field(default=30)
 
     class Config:
         env_file = '.env'
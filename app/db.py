@@ -1,7 +1,16 @@
 import pathlib
-from cassandra.cluster import Cluster
+import threading
+from cassandra import ConsistencyLevel
+from cassandra.cluster import Cluster, EXEC_PROFILE_DEFAULT, ExecutionProfile
 from cassandra.auth import PlainTextAuthProvider
 from cassandra.cqlengine import connection
+from cassandra.policies import (
+    ConstantSpeculativeExecutionPolicy,
+    DCAwareRoundRobinPolicy,
+    FallthroughRetryPolicy,
+    TokenAwarePolicy,
+)
+from cassandra.query import dict_factory
 
 from . import config
 
@@ -13,15 +22,97 @@ ASTRADB_CONNECT_BUNDLE = BASE_DIR / "connect_bundle" / "astradb_connect.zip"
 ASTRADB_CLIENT_ID = settings.db_client_id
 ASTRADB_CLIENT_SECRET = settings.db_client_secret
 
+# Latency-sensitive single-partition reads: short timeout, and a second
+# attempt against another replica when the first is slow.
+EXEC_PROFILE_POINT_READ = "point_read"
+# Full-table scans and backfills: long timeout, no speculation.
+EXEC_PROFILE_SCAN = "scan"
+# Watch heartbeats: a lost write is replaced by the next one, so don't
+# retry and don't wait long.
+EXEC_PROFILE_HEARTBEAT = "heartbeat"
 
-def get_session():
-    cloud_config = {
-        'secure_connect_bundle': ASTRADB_CONNECT_BUNDLE
+_prepared_statements = {}
+_session = None
+_session_lock = threading.Lock()
+
+
+def load_balancing_policy():
+    return TokenAwarePolicy(DCAwareRoundRobinPolicy(local_dc=settings.db_local_dc or None))
+
+
+def execution_profiles():
+    def profile(**kwargs):
+        kwargs.setdefault("consistency_level", ConsistencyLevel.LOCAL_QUORUM)
+        return ExecutionProfile(
+            load_balancing_policy=load_balancing_policy(), row_factory=dict_factory, **kwargs)
+
+    return {
+        EXEC_PROFILE_DEFAULT: profile(request_timeout=settings.db_request_timeout),
+        EXEC_PROFILE_POINT_READ: profile(
+            request_timeout=settings.db_point_read_timeout,
+            speculative_execution_policy=ConstantSpeculativeExecutionPolicy(
+                settings.db_speculative_delay, settings.db_speculative_attempts)),
+        EXEC_PROFILE_SCAN: profile(request_timeout=settings.db_scan_timeout),
+        EXEC_PROFILE_HEARTBEAT: profile(
+            request_timeout=settings.db_heartbeat_timeout,
+            consistency_level=ConsistencyLevel.LOCAL_ONE,
+            retry_policy=FallthroughRetryPolicy()),
+    }
+
+
+def build_cluster():
+    """
+    A Cluster for `db_contact_points` when set, e.g. a local node, and
+    for the Astra secure connect bundle otherwise.
+    """
+    auth_provider = None
+    if ASTRADB_CLIENT_ID:
+        auth_provider = PlainTextAuthProvider(ASTRADB_CLIENT_ID, ASTRADB_CLIENT_SECRET)
+    options = {
+        "execution_profiles": execution_profiles(),
+        "auth_provider": auth_provider,
+        "connect_timeout": settings.db_connect_timeout,
+        "executor_threads": settings.db_executor_threads,
     }
-    auth_provider = PlainTextAuthProvider(
-        ASTRADB_CLIENT_ID, ASTRADB_CLIENT_SECRET)
-    cluster = Cluster(cloud=cloud_config, auth_provider=auth_provider)
-    session = cluster.connect()
-    connection.register_connection(str(session), session=session)
-    connection.set_default_connection(str(session))
-    return session
+    if settings.db_contact_points:
+        contact_points = [host.strip() for host in settings.db_contact_points.split(",") if host.strip()]
+        return Cluster(contact_points=contact_points, port=settings.db_port, **options)
+    return Cluster(cloud={'secure_connect_bundle': ASTRADB_CONNECT_BUNDLE}, **options)
+
+
+def get_session():
+    """
+    The process-wide session, connected and registered with cqlengine on
+    first use. Later calls return the same session until `shutdown`.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None and not _session.is_shutdown:
+            return _session
+        _prepared_statements.clear()
+        cluster = build_cluster()
+        session = cluster.connect()
+        connection.register_connection(str(session), session=session)
+        connection.set_default_connection(str(session))
+        _session = session
+        return session
+
+
+def shutdown():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.cluster.shutdown()
+            _session = None
+        _prepared_statements.clear()
+
+
+def prepare(query):
+    stmt = _prepared_statements.get(query)
+    if stmt is None:
+        session = connection.get_session()
+        stmt = session.prepare(query)
+        # Only idempotent statements are retried speculatively.
+        stmt.is_idempotent = query.lstrip().upper().startswith("SELECT")
+        _prepared_statements[query] = stmt
+    return stmt
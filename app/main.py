@@ -1,61 +1,144 @@
+import asyncio
 import json
 import pathlib
-from cassandra.cqlengine.management import sync_table
-from fastapi import FastAPI, Request, Form
+import uuid
+from typing import Optional
+from fastapi import Depends, FastAPI, Request, Form
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 from pydantic.error_wrappers import ValidationError
 from starlette.middleware.authentication import AuthenticationMiddleware
 
-from . import db, utils
-from .playlists.models import Playlist
+from . import config, utils
+from .analytics.routers import router as analytics_router
+from .migrations.runner import check_schema_version, migrate
+from .pagination import paginate
+from .playlists.models import PlaylistByUser
 from .playlists.routers import router as playlist_router
-from .shortcuts import redirect, render
+from .shortcuts import is_htmx, precompile_templates, redirect, render
+from .storage import get_storage
 from .users.backends import JWTCookieBackend
 from .users.decorators import login_required
 from .users.auth import create_user
-from .users.models import User
+from .users.models import load_email_filter
 from .users.schemas import UserLoginSchema, UserSignupSchema
-from .videos.models import Video
+from .users.security import shutdown_executor
+from .videos.models import VideoByUser, load_search_index, video_cache
 from .videos.routers import router as video_router
-from .watch_events.models import WatchEvent
+from .videos.search import search_index
+from .watch_events.buffer import watch_event_buffer
 from .watch_events.routers import router as watch_event_router
 
+settings = config.get_settings()
+
 app = FastAPI()
 app.add_middleware(AuthenticationMiddleware, backend=JWTCookieBackend())
 app.include_router(video_router)
 app.include_router(watch_event_router)
 app.include_router(playlist_router)
-DB_SESSION = None
+app.include_router(analytics_router)
 
 from .handlers import *  # nopep8
 
 
 @app.on_event("startup")
 def on_startup():
-    global DB_SESSION
-    DB_SESSION = db.get_session()
-    sync_table(Playlist)
-    sync_table(User)
-    sync_table(Video)
-    sync_table(WatchEvent)
+    get_storage().connect()
+    precompile_templates()
+    # Schema changes are applied out of band with
+    # `python -m app.migrations.commands migrate`; workers only check.
+    # The in-memory backend has no schema to manage.
+    if get_storage().name == "cassandra":
+        if settings.migrate_on_startup:
+            migrate()
+        else:
+            check_schema_version()
+    load_email_filter()
+    load_search_index()
+    watch_event_buffer.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    watch_event_buffer.stop()
+    shutdown_executor()
+    get_storage().shutdown()
+
+
+def user_library_page(Classname, user_id, cursor=None):
+    """One page of a user's `videos_by_user` or `playlists_by_user` partition."""
+    user_id = uuid.UUID(str(user_id))
+    return paginate(Classname, f"{Classname.__table_name__}:{user_id}", cursor=cursor,
+                    where={"user_id": user_id})
 
 
 @app.get("/", response_class=HTMLResponse)
-def homepage(request: Request):
+async def homepage(request: Request):
     if request.user.is_authenticated:
-        return render(request, "dashboard.html", {})
+        (videos, videos_cursor), (playlists, playlists_cursor) = await asyncio.gather(
+            user_library_page(VideoByUser, request.user.username),
+            user_library_page(PlaylistByUser, request.user.username),
+        )
+        context = {
+            "videos": videos,
+            "videos_cursor": videos_cursor,
+            "playlists": playlists,
+            "playlists_cursor": playlists_cursor,
+        }
+        return render(request, "dashboard.html", context)
     return render(request, "home.html", {})
 
 
+@app.get("/dashboard/videos", response_class=HTMLResponse)
+@login_required
+async def dashboard_videos_view(request: Request, cursor: Optional[str] = None, is_htmx=Depends(is_htmx)):
+    object_list, next_cursor = await user_library_page(
+        VideoByUser, request.user.username, cursor=cursor)
+    context = {
+        "object_list": object_list,
+        "next_cursor": next_cursor,
+        "list_path": "/dashboard/videos",
+    }
+    if is_htmx:
+        return render(request, "videos/htmx/list-items.html", context)
+    return render(request, "videos/list.html", context)
+
+
+@app.get("/dashboard/playlists", response_class=HTMLResponse)
+@login_required
+async def dashboard_playlists_view(request: Request, cursor: Optional[str] = None, is_htmx=Depends(is_htmx)):
+    object_list, next_cursor = await user_library_page(
+        PlaylistByUser, request.user.username, cursor=cursor)
+    context = {
+        "object_list": object_list,
+        "next_cursor": next_cursor,
+        "list_path": "/dashboard/playlists",
+    }
+    if is_htmx:
+        return render(request, "playlists/htmx/list-items.html", context)
+    return render(request, "playlists/list.html", context)
+
+
+@app.get("/api/videos/cache/stats")
+@login_required
+def video_cache_stats_view(request: Request):
+    return video_cache.stats()
+
+
+@app.get("/api/videos/search/stats")
+@login_required
+def video_search_stats_view(request: Request):
+    return search_index.stats()
+
+
 @app.get("/account", response_class=HTMLResponse)
 @login_required
-def account_view(request: Request):
+async def account_view(request: Request):
     return render(request, "account.html")
 
 
 @app.get("/login", response_class=HTMLResponse)
-def login_get_view(request: Request):
+async def login_get_view(request: Request):
     session_id = request.cookies.get("session_id") or None
     return render(request, "auth/login.html", {"logged_in": session_id is not None})
 
@@ -86,7 +169,7 @@ def login_post_view(request: Request,
 
 
 @app.get("/signup", response_class=HTMLResponse)
-def signup_get_view(request: Request):
+async def signup_get_view(request: Request):
     return render(request, "auth/signup.html", {})
 
 
@@ -114,5 +197,8 @@ def signup_post_view(request: Request,
         return render(request, "auth/signup.html", context, status_code=400)
 
     user_obj = create_user(data['email'], data['password'].get_secret_value())
+    if user_obj is None:
+        context["errors"] = [{"loc": ["email"], "msg": "Email is not available"}]
+        return render(request, "auth/signup.html", context, status_code=400)
 
     return redirect("/login")
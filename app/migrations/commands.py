@@ -0,0 +1,33 @@
+import argparse
+
+from app import db
+from .runner import current_version, history, migrate, pending_migrations
+from .versions import LATEST_VERSION
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.migrations.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("status", help="Show applied and pending migrations")
+    apply = subparsers.add_parser("migrate", help="Apply pending migrations")
+    apply.add_argument("--to", type=int, default=None, help="Stop after this version")
+    args = parser.parse_args(argv)
+
+    db.get_session()
+    try:
+        if args.command == "status":
+            version = current_version()
+            for obj in reversed(history()):
+                print(f"  {obj.version:>4} {obj.name:<24} applied {obj.applied_at:%Y-%m-%d %H:%M}")
+            for migration in pending_migrations(version):
+                print(f"  {migration.version:>4} {migration.name:<24} pending")
+            print(f"Schema version {version}, code expects {LATEST_VERSION}")
+        elif args.command == "migrate":
+            applied = migrate(target=args.to)
+            print(f"Applied {len(applied)} migrations, schema version {current_version()}")
+    finally:
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
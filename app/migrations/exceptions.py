@@ -0,0 +1,6 @@
+class SchemaVersionError(Exception):
+    pass
+
+
+class MigrationLockedException(Exception):
+    pass
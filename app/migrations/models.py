@@ -0,0 +1,25 @@
+from cassandra.cqlengine import columns
+from cassandra.cqlengine.models import Model
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class SchemaMigration(Model):
+    """One applied migration; the newest version sorts first."""
+    __keyspace__ = settings.keyspace
+    __table_name__ = "schema_migrations"
+    scope = columns.Text(partition_key=True, default="app")
+    version = columns.Integer(primary_key=True, clustering_order="DESC")
+    name = columns.Text()
+    applied_at = columns.DateTime()
+
+
+class MigrationLock(Model):
+    """Held with IF NOT EXISTS while migrations run, so only one runner applies them."""
+    __keyspace__ = settings.keyspace
+    __table_name__ = "schema_migration_lock"
+    name = columns.Text(primary_key=True)
+    owner = columns.UUID()
+    acquired_at = columns.DateTime()
@@ -0,0 +1,139 @@
+import datetime
+import threading
+import uuid
+
+from cassandra import InvalidRequest
+from cassandra.cqlengine import connection
+from cassandra.cqlengine.management import sync_table
+
+from app.config import get_settings
+from .exceptions import MigrationLockedException, SchemaVersionError
+from .models import MigrationLock, SchemaMigration
+from .versions import LATEST_VERSION, MIGRATIONS, apply
+
+settings = get_settings()
+
+LOCK_NAME = "migrate"
+
+
+def current_version():
+    """The newest applied version; 0 before the first migration."""
+    try:
+        rows = connection.get_session().execute(
+            f"SELECT version FROM {SchemaMigration.column_family_name()} "
+            "WHERE scope = 'app' LIMIT 1")
+    except InvalidRequest:
+        # schema_migrations does not exist yet.
+        return 0
+    rows = list(rows)
+    return rows[0]["version"] if rows else 0
+
+
+def pending_migrations(version, target=None, migrations=MIGRATIONS):
+    target = LATEST_VERSION if target is None else target
+    return [m for m in migrations if version < m.version <= target]
+
+
+def check_schema_version():
+    """
+    Fail fast when the keyspace is behind this code. One single-row read,
+    meant for startup; applying migrations is left to `migrate`.
+    """
+    version = current_version()
+    if version < LATEST_VERSION:
+        raise SchemaVersionError(
+            f"Schema is at version {version}, this code needs {LATEST_VERSION}. "
+            "Run `python -m app.migrations.commands migrate` first.")
+    return version
+
+
+def _acquire_lock(owner):
+    result = connection.get_session().execute(
+        f"INSERT INTO {MigrationLock.column_family_name()} (name, owner, acquired_at) "
+        "VALUES (%s, %s, %s) IF NOT EXISTS USING TTL %s",
+        [LOCK_NAME, owner, datetime.datetime.utcnow(), settings.migration_lock_ttl])
+    if not result.was_applied:
+        raise MigrationLockedException(
+            f"Migrations are already running (lock held by {result.one()['owner']})")
+
+
+def _renew_lock(owner):
+    """Push the lock's expiry out by another TTL; False if `owner` lost it."""
+    result = connection.get_session().execute(
+        f"UPDATE {MigrationLock.column_family_name()} USING TTL %s "
+        "SET owner = %s, acquired_at = %s WHERE name = %s IF owner = %s",
+        [settings.migration_lock_ttl, owner, datetime.datetime.utcnow(), LOCK_NAME, owner])
+    return result.was_applied
+
+
+class _LockKeeper:
+    """
+    Renews the lock every third of its TTL while migrations run, so a
+    long backfill does not outlive it. `check` raises once a renewal
+    found the lock gone; the runner calls it before every step.
+    """
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.lost = False
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="migration-lock", daemon=True)
+
+    def _run(self):
+        while not self._stopped.wait(settings.migration_lock_ttl / 3):
+            try:
+                if not _renew_lock(self.owner):
+                    self.lost = True
+                    return
+            except Exception:
+                # Retried on the next tick, well before the TTL runs out.
+                continue
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def check(self):
+        if self.lost:
+            raise MigrationLockedException("The migration lock expired while migrations ran")
+
+
+def _release_lock(owner):
+    connection.get_session().execute(
+        f"DELETE FROM {MigrationLock.column_family_name()} WHERE name = %s IF owner = %s",
+        [LOCK_NAME, owner])
+
+
+def migrate(target=None, log=print):
+    """
+    Apply every pending migration up to `target`, recording each one as
+    it completes. Runs under a lightweight-transaction lock so that two
+    deploys can't apply DDL concurrently; the lock is renewed until the
+    run finishes. Returns the versions applied.
+    """
+    sync_table(SchemaMigration)
+    sync_table(MigrationLock)
+    owner = uuid.uuid4()
+    _acquire_lock(owner)
+    keeper = _LockKeeper(owner)
+    keeper.start()
+    applied = []
+    try:
+        for migration in pending_migrations(current_version(), target):
+            keeper.check()
+            log(f"Applying {migration.version} {migration.name}")
+            apply(migration)
+            SchemaMigration.create(version=migration.version, name=migration.name,
+                                   applied_at=datetime.datetime.utcnow())
+            applied.append(migration.version)
+    finally:
+        keeper.stop()
+        _release_lock(owner)
+    return applied
+
+
+def history():
+    return list(SchemaMigration.objects.filter(scope="app").limit(None))
@@ -0,0 +1,80 @@
+"""
+The schema history, oldest first. A migration creates or alters tables
+through `sync_table` and may run a backfill once they exist; both must
+be safe to repeat, because a run that fails part way is retried from
+the last recorded version.
+"""
+from collections import namedtuple
+
+from cassandra.cqlengine import connection
+from cassandra.cqlengine.management import sync_table
+
+from app.config import get_settings
+
+Migration = namedtuple("Migration", ["version", "name", "tables", "backfill"])
+
+
+def _models():
+    from app.analytics.models import VideoWatchRollup
+    from app.playlists.models import Playlist, PlaylistByUser, PlaylistItem
+    from app.users.models import User, UserById, UserEmail
+    from app.videos.models import UserVideo, Video, VideoByUser
+    from app.watch_events.models import WatchEvent, WatchPosition
+    return locals()
+
+
+def _backfill_positions():
+    from app.watch_events.commands import backfill_positions, copy_legacy_events
+    # Keyspaces from before the day buckets still hold their events in the
+    # old watch_event table; positions are built from the copied rows.
+    if _has_table("watch_event"):
+        copy_legacy_events()
+    backfill_positions()
+
+
+def _has_table(name):
+    keyspace = connection.get_cluster().metadata.keyspaces.get(get_settings().keyspace)
+    return keyspace is not None and name in keyspace.tables
+
+
+def _backfill_user_lookups():
+    from app.users.commands import backfill_user_lookups
+    backfill_user_lookups()
+
+
+def _backfill_user_videos():
+    from app.videos.commands import backfill_user_videos
+    backfill_user_videos()
+
+
+def _backfill_libraries():
+    from app.playlists.commands import backfill_playlists_by_user
+    from app.videos.commands import backfill_videos_by_user
+    backfill_videos_by_user()
+    backfill_playlists_by_user()
+
+
+def _migrate_playlist_items():
+    from app.playlists.commands import migrate_playlist_items
+    migrate_playlist_items()
+
+
+MIGRATIONS = [
+    Migration(1, "initial", ["User", "Video", "Playlist", "WatchEvent"], None),
+    Migration(2, "watch_positions", ["WatchPosition"], _backfill_positions),
+    Migration(3, "user_lookups", ["UserById", "UserEmail"], _backfill_user_lookups),
+    Migration(4, "user_video_claims", ["UserVideo"], _backfill_user_videos),
+    Migration(5, "user_libraries", ["VideoByUser", "PlaylistByUser"], _backfill_libraries),
+    Migration(6, "watch_rollups", ["VideoWatchRollup"], None),
+    Migration(7, "playlist_items", ["PlaylistItem"], _migrate_playlist_items),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def apply(migration):
+    models = _models()
+    for table in migration.tables:
+        sync_table(models[table])
+    if migration.backfill is not None:
+        migration.backfill()
@@ -0,0 +1,64 @@
+import base64
+import binascii
+import hashlib
+import hmac
+
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+from app import config, repository
+from app.cache import LRUCache
+
+settings = config.get_settings()
+
+# First pages shown to anonymous visitors, keyed by listing.
+first_page_cache = LRUCache(maxsize=64, ttl=settings.list_cache_ttl)
+
+
+def _signature(scope, paging_state):
+    mac = hmac.new(settings.secret_key.encode(),
+                   scope.encode() + b":" + paging_state, hashlib.sha256)
+    return base64.urlsafe_b64encode(mac.digest()[:16]).decode().rstrip("=")
+
+
+def encode_cursor(scope, paging_state):
+    """Opaque, signed cursor for a driver paging state of listing `scope`."""
+    if paging_state is None:
+        return None
+    payload = base64.urlsafe_b64encode(paging_state).decode().rstrip("=")
+    return f"{payload}.{_signature(scope, paging_state)}"
+
+
+def decode_cursor(scope, cursor):
+    if not cursor:
+        return None
+    try:
+        payload, signature = cursor.split(".", 1)
+        paging_state = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+    except (ValueError, binascii.Error):
+        raise StarletteHTTPException(status_code=400)
+    if not hmac.compare_digest(signature, _signature(scope, paging_state)):
+        raise StarletteHTTPException(status_code=400)
+    return paging_state
+
+
+async def paginate(Classname, scope, cursor=None, page_size=None, cache=False, where=None):
+    """
+    One page of `Classname` rows and the cursor of the next page. With
+    `cache`, the first page is served from `first_page_cache` for a few
+    seconds. `where` restricts the listing, e.g. to one partition; `scope`
+    must then name that partition so cursors can't be replayed against
+    another one.
+    """
+    page_size = page_size or settings.list_page_size
+    cache_key = (scope, page_size)
+    if cache and not cursor:
+        page = first_page_cache.get(cache_key)
+        if page is not None:
+            return page
+    objects, paging_state = await repository.list_page(
+        Classname, page_size=page_size, paging_state=decode_cursor(scope, cursor),
+        where=where)
+    page = (objects, encode_cursor(scope, paging_state))
+    if cache and not cursor:
+        first_page_cache.set(cache_key, page)
+    return page
@@ -0,0 +1,114 @@
+import argparse
+
+from cassandra.concurrent import execute_concurrent_with_args
+from cassandra.cqlengine import connection
+from cassandra.query import BatchStatement, BatchType
+from cassandra.util import unix_time_from_uuid1, uuid_from_time
+
+from app import db
+from .models import Playlist, PlaylistByUser, PlaylistItem
+from .positions import keys_before
+
+
+def backfill_playlists_by_user(fetch_size=1000, concurrency=50):
+    """Write the `PlaylistByUser` row of every existing `Playlist` with an owner."""
+    session = connection.get_session()
+    stmt = db.prepare(
+        f"INSERT INTO {PlaylistByUser.column_family_name()} "
+        "(user_id, db_id, title) VALUES (?, ?, ?)")
+    q = Playlist.objects.all().limit(None).fetch_size(fetch_size).values_list(
+        "user_id", "db_id", "title")
+    pending = []
+    written = 0
+    for row in q:
+        if row[0] is None:
+            continue
+        pending.append(row)
+        if len(pending) >= fetch_size:
+            execute_concurrent_with_args(
+                session, stmt, pending, concurrency=concurrency, raise_on_first_error=True)
+            written += len(pending)
+            pending = []
+    if pending:
+        execute_concurrent_with_args(
+            session, stmt, pending, concurrency=concurrency, raise_on_first_error=True)
+        written += len(pending)
+    return written
+
+
+def migrate_playlist_items(fetch_size=100, chunk_size=100):
+    """
+    Move the `host_ids` list of every playlist into `PlaylistItem` rows,
+    ahead of any items the playlist already has, and clear the list once
+    they are written. A playlist with no list left is done.
+
+    Item ids are derived from the playlist and the list index. A run
+    interrupted before clearing a list is simply repeated: the items it
+    wrote are recognized by their ids, placed again and any left at an
+    outdated position are deleted.
+    """
+    session = connection.get_session()
+    table = PlaylistItem.column_family_name()
+    insert_stmt = db.prepare(
+        f"INSERT INTO {table} (playlist_id, position, item_id, host_id) VALUES (?, ?, ?, ?)")
+    delete_stmt = db.prepare(
+        f"DELETE FROM {table} WHERE playlist_id = ? AND position = ? AND item_id = ?")
+    clear_stmt = db.prepare(
+        f"DELETE host_ids FROM {Playlist.column_family_name()} WHERE db_id = ?")
+    q = Playlist.objects.all().limit(None).fetch_size(fetch_size).values_list("db_id", "host_ids")
+    migrated = 0
+    for db_id, host_ids in q:
+        if not host_ids:
+            continue
+        created = unix_time_from_uuid1(db_id)
+        item_ids = [uuid_from_time(created, node=index, clock_seq=0) for index in range(len(host_ids))]
+        legacy = set(item_ids)
+        existing = PlaylistItem.objects.filter(playlist_id=db_id).limit(None).values_list(
+            "position", "item_id")
+        first, written = None, []
+        for position, item_id in existing:
+            if item_id in legacy:
+                written.append((position, item_id))
+            elif first is None:
+                first = position
+        rows = [(db_id, position, item_id, host_id) for position, item_id, host_id
+                in zip(keys_before(first, len(host_ids)), item_ids, host_ids)]
+        keys = {(position, item_id) for _, position, item_id, _ in rows}
+        statements = [(insert_stmt, row) for row in rows]
+        statements += [(delete_stmt, (db_id, position, item_id))
+                       for position, item_id in written if (position, item_id) not in keys]
+        for start in range(0, len(statements), chunk_size):
+            batch = BatchStatement(batch_type=BatchType.UNLOGGED)
+            for stmt, params in statements[start:start + chunk_size]:
+                batch.add(stmt, params)
+            session.execute(batch)
+        session.execute(clear_stmt, [db_id])
+        migrated += 1
+    return migrated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.playlists.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser(
+        "backfill_playlists_by_user", help="Build the playlists_by_user table")
+    backfill.add_argument("--fetch-size", type=int, default=1000)
+    migrate = subparsers.add_parser(
+        "migrate_playlist_items", help="Move playlist host_ids lists into playlist_items")
+    migrate.add_argument("--fetch-size", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    db.get_session()
+    try:
+        if args.command == "backfill_playlists_by_user":
+            written = backfill_playlists_by_user(fetch_size=args.fetch_size)
+            print(f"Backfilled {written} playlists")
+        elif args.command == "migrate_playlist_items":
+            migrated = migrate_playlist_items(fetch_size=args.fetch_size)
+            print(f"Migrated {migrated} playlists")
+    finally:
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,34 @@
 import uuid
+from collections import namedtuple
 from datetime import datetime
 from cassandra.cqlengine import columns
 from cassandra.cqlengine.models import Model
 
+from app.cache import LRUCache
 from app.config import get_settings
+from app.storage import Delete, get_storage, insert, key_of
 from app.videos.models import Video
+from .positions import key_between, keys_after
 
 settings = get_settings()
 
+# Watch progress summaries keyed by (user_id, playlist_id).
+progress_cache = LRUCache(maxsize=settings.playlist_progress_cache_size,
+                          ttl=settings.playlist_progress_cache_ttl)
+
+# One item of a playlist with its video: `video` is None when the video
+# is gone, or when reading it failed, in which case `error` holds the
+# exception.
+PlaylistEntry = namedtuple("PlaylistEntry", ["position", "item_id", "host_id", "video", "error"])
+
 
 class Playlist(Model):
     __keyspace__ = settings.keyspace
     db_id = columns.UUID(primary_key=True, default=uuid.uuid1)
     user_id = columns.UUID()
     updated = columns.DateTime(default=datetime.utcnow())
+    # Legacy; `migrate_playlist_items` moves it into `PlaylistItem` rows
+    # and clears it.
     host_ids = columns.List(value_type=columns.Text)
     title = columns.Text()
 
@@ -21,24 +36,119 @@ class Playlist(Model):
     def path(self):
         return f"/playlists/{self.db_id}"
 
-    def add_host_ids(self, host_ids=[], replace_all=False):
-        if not isinstance(host_ids, list):
-            return False
-        if replace_all:
-            self.host_ids = host_ids
-        else:
-            self.host_ids += host_ids
-        self.updated = datetime.utcnow()
-        self.save()
-        return True
-
-    def get_videos(self):
-        videos = []
-        for host_id in self.host_ids:
-            try:
-                video_obj = Video.objects.get(host_id=host_id)
-            except:
-                video_obj = None
-            if video_obj is not None:
-                videos.append(video_obj)
-        return videos
+    @staticmethod
+    def create_playlist(user_id, title=None):
+        obj = Playlist(user_id=user_id, title=title)
+        get_storage().batch([
+            insert(obj),
+            insert(PlaylistByUser(user_id=user_id, db_id=obj.db_id, title=title)),
+        ])
+        return obj
+
+    def delete_playlist(self):
+        statements = [
+            Delete(Playlist, {"db_id": self.db_id}),
+            Delete(PlaylistItem, {"playlist_id": self.db_id}),
+        ]
+        if self.user_id is not None:
+            statements.append(Delete(PlaylistByUser, {"user_id": self.user_id, "db_id": self.db_id}))
+        get_storage().batch(statements)
+
+    def last_position(self):
+        items = get_storage().filter(
+            PlaylistItem, {"playlist_id": self.db_id}, columns=["position"], limit=1, reverse=True)
+        return items[0].position if items else None
+
+    def append_videos(self, host_ids, chunk_size=100):
+        """
+        Add `host_ids` at the end in single-partition batches of at most
+        `chunk_size` rows, which keeps large imports below the batch size
+        limit. Keys and item ids are chosen before the first write, so a
+        retried batch writes the same rows again instead of appending twice.
+        """
+        if not host_ids:
+            return []
+        positions = keys_after(self.last_position(), len(host_ids))
+        items = [PlaylistItem(playlist_id=self.db_id, position=position, host_id=host_id)
+                 for position, host_id in zip(positions, host_ids)]
+        storage = get_storage()
+        for start in range(0, len(items), chunk_size):
+            storage.batch([insert(item) for item in items[start:start + chunk_size]], logged=False)
+        return items
+
+    def remove_item(self, position, item_id):
+        get_storage().delete(PlaylistItem, playlist_id=self.db_id, position=position, item_id=item_id)
+
+    def move_item(self, position, item_id, after=None, before=None):
+        """
+        Move an item between the items at positions `after` and `before`;
+        None stands for the start or the end. Returns the moved item, or
+        None if it no longer exists.
+        """
+        storage = get_storage()
+        item = storage.get(PlaylistItem, playlist_id=self.db_id, position=position, item_id=item_id)
+        if item is None:
+            return None
+        moved = PlaylistItem(playlist_id=self.db_id, position=key_between(after, before),
+                             item_id=item.item_id, host_id=item.host_id)
+        storage.batch([Delete(PlaylistItem, key_of(item)), insert(moved)])
+        return moved
+
+    def get_items(self):
+        return get_storage().filter(PlaylistItem, {"playlist_id": self.db_id})
+
+    @staticmethod
+    def entries(items, found):
+        """Playlist entries in order from items and a `Video.get_many` result."""
+        return [PlaylistEntry(item.position, item.item_id, item.host_id, *found[item.host_id])
+                for item in items]
+
+    def get_entries(self, concurrency=None):
+        items = self.get_items()
+        found = Video.get_many([item.host_id for item in items], concurrency=concurrency)
+        return self.entries(items, found)
+
+    def get_videos(self, concurrency=None):
+        """The videos of the playlist in order, skipping missing and unreadable ones."""
+        return [entry.video for entry in self.get_entries(concurrency) if entry.video is not None]
+
+
+def summarize_progress(host_ids, fractions):
+    """
+    Progress of a playlist from `{host_id: watched fraction}`. Each video
+    counts once however often it is in the playlist.
+    """
+    host_ids = list(dict.fromkeys(host_ids))
+    videos = {host_id: fractions.get(host_id, 0.0) for host_id in host_ids}
+    return {
+        "videos": videos,
+        "total": len(videos),
+        "completed": sum(1 for fraction in videos.values() if fraction >= 1.0),
+        "percent": 100 * sum(videos.values()) / len(videos) if videos else 0.0,
+    }
+
+
+class PlaylistItem(Model):
+    """
+    One video of a playlist. Items are clustered by a `positions` key, so
+    appending, removing or moving one writes only that row.
+    """
+    __keyspace__ = settings.keyspace
+    __table_name__ = "playlist_items"
+    playlist_id = columns.UUID(primary_key=True)
+    position = columns.Text(primary_key=True)
+    item_id = columns.TimeUUID(primary_key=True, default=uuid.uuid1)
+    host_id = columns.Text()
+
+
+class PlaylistByUser(Model):
+    """A user's playlists, newest first, for the dashboard library."""
+    __keyspace__ = settings.keyspace
+    __table_name__ = "playlists_by_user"
+    user_id = columns.UUID(primary_key=True)
+    db_id = columns.TimeUUID(primary_key=True, clustering_order="DESC")
+    title = columns.Text()
+
+    @property
+    def path(self):
+        return f"/playlists/{self.db_id}"
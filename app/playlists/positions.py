@@ -0,0 +1,97 @@
+"""
+Sortable position keys for playlist items.
+
+A key is an 8 digit base 62 integer part followed by an optional
+fraction. Appending or prepending steps the integer part, so keys stay
+short however long a playlist grows; inserting between two neighbours
+whose integer parts touch extends the fraction instead. Keys compare
+correctly as plain strings, which is how Cassandra orders the text
+clustering column.
+"""
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+INTEGER_WIDTH = 8
+INTEGER_MAX = len(DIGITS) ** INTEGER_WIDTH - 1
+
+
+def _encode(number):
+    chars = []
+    for _ in range(INTEGER_WIDTH):
+        number, digit = divmod(number, len(DIGITS))
+        chars.append(DIGITS[digit])
+    return "".join(reversed(chars))
+
+
+def _decode(key):
+    number = 0
+    for char in key[:INTEGER_WIDTH]:
+        number = number * len(DIGITS) + DIGITS.index(char)
+    return number
+
+
+def _midpoint(a, b):
+    """
+    A fraction strictly between fractions `a` and `b` (None is 1), given
+    a < b and neither ends in "0".
+    """
+    if b is not None:
+        n = 0
+        while (a[n] if n < len(a) else "0") == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b) // 2]
+    if b is not None and len(b) > 1:
+        return b[0]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def key_between(a=None, b=None):
+    """
+    A key that sorts after `a` and before `b`; None stands for the start
+    or the end of the playlist.
+    """
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} is not before {b!r}")
+    if a is None and b is None:
+        return _encode((INTEGER_MAX + 1) // 2)
+    if b is None:
+        number = _decode(a)
+        if number < INTEGER_MAX:
+            return _encode(number + 1)
+        return a[:INTEGER_WIDTH] + _midpoint(a[INTEGER_WIDTH:], None)
+    if a is None:
+        number = _decode(b)
+        if number > 0 and not b[INTEGER_WIDTH:]:
+            return _encode(number - 1)
+        if number > 0:
+            return _encode(number)
+        if not b[INTEGER_WIDTH:]:
+            raise ValueError(f"No key sorts before {b!r}")
+        return b[:INTEGER_WIDTH] + _midpoint("", b[INTEGER_WIDTH:])
+    low, high = _decode(a), _decode(b)
+    if high - low > 1:
+        return _encode((low + high) // 2)
+    if high == low:
+        return a[:INTEGER_WIDTH] + _midpoint(a[INTEGER_WIDTH:], b[INTEGER_WIDTH:])
+    return a[:INTEGER_WIDTH] + _midpoint(a[INTEGER_WIDTH:], None)
+
+
+def keys_after(a, count):
+    """`count` increasing keys after `a` (or from the middle when None)."""
+    keys = []
+    for _ in range(count):
+        a = key_between(a, None)
+        keys.append(a)
+    return keys
+
+
+def keys_before(b, count):
+    """`count` increasing keys before `b` (or up to the middle when None)."""
+    keys = []
+    for _ in range(count):
+        b = key_between(None, b)
+        keys.append(b)
+    return keys[::-1]
@@ -1,16 +1,19 @@
+import asyncio
 import uuid
 from typing import Optional
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse
 from starlette.exceptions import HTTPException
 
-from app import utils
-from app.shortcuts import get_object_or_404, redirect, render, is_htmx
+from app import config, repository, utils
+from app.pagination import paginate
+from app.shortcuts import get_object_or_404, object_or_404, redirect, render, is_htmx
 from app.users.decorators import login_required
-from app.watch_events.models import WatchEvent
-from .models import Playlist
+from .models import Playlist, PlaylistItem
 from .schemas import PlaylistCreateSchema, PlaylistVideoAddSchema
 
+settings = config.get_settings()
+
 router = APIRouter(
     prefix="/playlists"
 )
@@ -18,7 +21,7 @@ router = APIRouter(
 
 @router.get("/create", response_class=HTMLResponse)
 @login_required
-def playlist_create_view(request: Request):
+async def playlist_create_view(request: Request):
     return render(request, "playlists/create.html", {})
 
 
@@ -37,34 +40,91 @@ def playlist_create_post_view(request: Request, title: str = Form(...)):
     }
     if len(errors) > 0:
         return render(request, "playlists/create.html", context, status_code=400)
-    obj = Playlist.objects.create(**data)
+    obj = Playlist.create_playlist(**data)
     redirect_path = obj.path or "/playlists/create"
     return redirect(redirect_path)
 
 
 @router.get("/", response_class=HTMLResponse)
-def playlist_list_view(request: Request):
-    q = Playlist.objects.all().limit(100)
+async def playlist_list_view(request: Request, cursor: Optional[str] = None, is_htmx=Depends(is_htmx)):
+    object_list, next_cursor = await paginate(
+        Playlist, "playlists", cursor=cursor, cache=not request.user.is_authenticated)
     context = {
-        "object_list": q
+        "object_list": object_list,
+        "next_cursor": next_cursor,
     }
+    if is_htmx:
+        return render(request, "playlists/htmx/list-items.html", context)
     return render(request, "playlists/list.html", context)
 
 
+async def playlist_entries_page(playlist_obj, cursor=None):
+    """One page of a playlist's items with their videos, and the next cursor."""
+    items, next_cursor = await paginate(
+        PlaylistItem, f"playlist_items:{playlist_obj.db_id}", cursor=cursor,
+        page_size=settings.playlist_page_size,
+        where={"playlist_id": playlist_obj.db_id})
+    found = await repository.get_videos([item.host_id for item in items])
+    return Playlist.entries(items, found), next_cursor
+
+
+async def user_progress(request, playlist_obj):
+    if not request.user.is_authenticated:
+        return None
+    return await repository.get_playlist_progress(request.user.username, playlist_obj.db_id)
+
+
 @router.get("/{db_id}", response_class=HTMLResponse)
-def playlist_detail_view(request: Request, db_id: uuid.UUID):
-    playlist_obj = get_object_or_404(Playlist, db_id=db_id)
+async def playlist_detail_view(request: Request, db_id: uuid.UUID):
+    playlist_obj = object_or_404(await repository.get_playlist(db_id))
+    (entries, next_cursor), progress = await asyncio.gather(
+        playlist_entries_page(playlist_obj), user_progress(request, playlist_obj))
     context = {
         "db_id": db_id,
         "object": playlist_obj,
-        "videos": playlist_obj.get_videos()
+        "entries": entries,
+        "next_cursor": next_cursor,
+        "progress": progress,
     }
     return render(request, "playlists/detail.html", context)
 
 
+@router.get("/{db_id}/items", response_class=HTMLResponse)
+async def playlist_items_view(request: Request, db_id: uuid.UUID, cursor: Optional[str] = None):
+    playlist_obj = object_or_404(await repository.get_playlist(db_id))
+    (entries, next_cursor), progress = await asyncio.gather(
+        playlist_entries_page(playlist_obj, cursor=cursor), user_progress(request, playlist_obj))
+    context = {
+        "object": playlist_obj,
+        "entries": entries,
+        "next_cursor": next_cursor,
+        "progress": progress,
+    }
+    return render(request, "playlists/htmx/entries.html", context)
+
+
+@router.get("/{db_id}/delete", response_class=HTMLResponse)
+@login_required
+async def playlist_delete_view(request: Request, db_id: uuid.UUID):
+    playlist_obj = object_or_404(await repository.get_playlist(db_id))
+    if str(playlist_obj.user_id) != request.user.username:
+        raise HTTPException(status_code=403)
+    return render(request, "playlists/delete.html", {"object": playlist_obj})
+
+
+@router.post("/{db_id}/delete", response_class=HTMLResponse)
+@login_required
+def playlist_delete_post_view(request: Request, db_id: uuid.UUID):
+    playlist_obj = get_object_or_404(Playlist, db_id=db_id)
+    if str(playlist_obj.user_id) != request.user.username:
+        raise HTTPException(status_code=403)
+    playlist_obj.delete_playlist()
+    return redirect("/")
+
+
 @router.get("/{db_id}/add-video", response_class=HTMLResponse)
 @login_required
-def add_video_to_playlist_view(
+async def add_video_to_playlist_view(
     request: Request,
     db_id: uuid.UUID,
     is_htmx=Depends(is_htmx)
@@ -112,12 +172,13 @@ def add_video_to_playlist_post_view(
 
 @router.post("/{db_id}/{host_id}/delete", response_class=HTMLResponse)
 @login_required
-def add_video_to_playlist_post_view(
+def playlist_item_delete_post_view(
     request: Request,
     db_id: uuid.UUID,
     host_id: str,
     is_htmx=Depends(is_htmx),
-    index: Optional[int] = Form(default=None)
+    position: str = Form(...),
+    item_id: uuid.UUID = Form(...),
 ):
     if not is_htmx:
         raise HTTPException(status_code=400)
@@ -125,8 +186,37 @@ def add_video_to_playlist_post_view(
         playlist_obj = get_object_or_404(Playlist, db_id=db_id)
     except:
         return HTMLResponse("Error. please reload the page.")
-    if isinstance(index, int):
-        host_ids = playlist_obj.host_ids
-        host_ids.pop(index)
-        playlist_obj.add_host_ids(host_ids, replace_all=True)
+    if str(playlist_obj.user_id) != request.user.username:
+        raise HTTPException(status_code=403)
+    playlist_obj.remove_item(position, item_id)
     return HTMLResponse("Deleted.")
+
+
+@router.post("/{db_id}/{host_id}/move", response_class=HTMLResponse)
+@login_required
+def playlist_item_move_post_view(
+    request: Request,
+    db_id: uuid.UUID,
+    host_id: str,
+    is_htmx=Depends(is_htmx),
+    position: str = Form(...),
+    item_id: uuid.UUID = Form(...),
+    after: Optional[str] = Form(default=None),
+    before: Optional[str] = Form(default=None),
+):
+    """Move an item between the items at positions `after` and `before`."""
+    if not is_htmx:
+        raise HTTPException(status_code=400)
+    try:
+        playlist_obj = get_object_or_404(Playlist, db_id=db_id)
+    except:
+        return HTMLResponse("Error. please reload the page.")
+    if str(playlist_obj.user_id) != request.user.username:
+        raise HTTPException(status_code=403)
+    try:
+        moved = playlist_obj.move_item(position, item_id, after=after or None, before=before or None)
+    except ValueError:
+        raise HTTPException(status_code=400)
+    if moved is None:
+        return HTMLResponse("Error. please reload the page.")
+    return HTMLResponse("Moved.")
@@ -1,7 +1,8 @@
 import uuid
 from pydantic import BaseModel, validator, root_validator
 
-from app.videos.extractors import extract_video_id
+from app.storage import get_storage
+from app.videos.extractors import extract
 from app.videos.models import Video
 from .models import Playlist
 
@@ -17,18 +18,9 @@ class PlaylistVideoAddSchema(BaseModel):
     title: str
     playlist_id: uuid.UUID
 
-    @validator("url")
-    def validate_video_url(cls, v, values, **kwargs):
-        url = v
-        video_id = extract_video_id(url)
-        if video_id is None:
-            raise ValueError(f"{url} is not a valid youtube url")
-        return url
-
     @validator("playlist_id")
     def validate_playlist_id(cls, v, values, **kwargs):
-        q = Playlist.objects.filter(db_id=v)
-        if q.count() == 0:
+        if get_storage().get(Playlist, db_id=v) is None:
             raise ValueError(f"{v} is not a valid Playlist")
         return v
 
@@ -38,12 +30,16 @@ class PlaylistVideoAddSchema(BaseModel):
         if url is None:
             raise ValueError(
                 "A valid url is required.")
+        found = extract(url)
+        if found is None:
+            raise ValueError(f"{url} is not a supported video url")
+        host_service, host_id = found
         user_id = values.get("user_id")
         playlist_id = values.get("playlist_id")
         title = values.get("title") if values.get("title") != "" else None
         try:
             video_obj, created = Video.get_or_create_video(
-                url, user_id, title=title)
+                url, user_id, host_id=host_id, host_service=host_service, title=title)
         except:
             raise ValueError(
                 "There's problem with your account, please try again.")
@@ -51,7 +47,6 @@ class PlaylistVideoAddSchema(BaseModel):
             raise ValueError(
                 "There's problem with your account, please try again.")
         else:
-            playlist_obj = Playlist.objects.get(db_id=playlist_id)
-            playlist_obj.add_host_ids(host_ids=[video_obj.host_id])
-            playlist_obj.save()
+            playlist_obj = get_storage().get(Playlist, db_id=playlist_id)
+            playlist_obj.append_videos([video_obj.host_id])
         return video_obj.as_data()
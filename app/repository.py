@@ -0,0 +1,133 @@
+"""
+Async versions of the hot model reads and writes.
+
+These run on the event loop through the storage backend's coroutines
+instead of blocking a threadpool thread, and return the same model
+instances.
+"""
+import asyncio
+import uuid
+
+from app.db import EXEC_PROFILE_POINT_READ
+from app.storage import Select, get_storage
+from app.config import get_settings
+from app.playlists.models import Playlist, PlaylistItem, progress_cache, summarize_progress
+from app.users.models import User, UserById, user_email_cache
+from app.videos.models import UNCACHED, Video, cache_video, lookup_video
+from app.watch_events.models import WatchPosition, resume_cache, watched_fraction
+
+settings = get_settings()
+
+
+def _as_uuid(value):
+    return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+async def _first(Classname, **where):
+    return await get_storage().aget(Classname, execution_profile=EXEC_PROFILE_POINT_READ, **where)
+
+
+async def list_page(Classname, page_size=100, paging_state=None, where=None):
+    rows, next_paging_state = await get_storage().apage(
+        Select(Classname, where), page_size=page_size, paging_state=paging_state)
+    return [Classname._construct_instance(row) for row in rows], next_paging_state
+
+
+async def get_video(host_id):
+    obj = lookup_video(host_id)
+    if obj is UNCACHED:
+        obj = cache_video(host_id, await _first(Video, host_id=host_id))
+    return obj
+
+
+async def get_video_rows(host_id):
+    """Every `Video` row of `host_id`, one per user who added it, uncached."""
+    return await get_storage().afilter(Video, {"host_id": host_id},
+                                       execution_profile=EXEC_PROFILE_POINT_READ)
+
+
+async def get_videos(host_ids, concurrency=None):
+    """Async `Video.get_many`: `{host_id: (video, error)}` for each distinct host id."""
+    semaphore = asyncio.Semaphore(concurrency or settings.video_fetch_concurrency)
+    found = {}
+
+    async def fetch(host_id):
+        async with semaphore:
+            try:
+                obj = await _first(Video, host_id=host_id)
+            except Exception as e:
+                found[host_id] = (None, e)
+            else:
+                found[host_id] = (cache_video(host_id, obj), None)
+
+    pending = []
+    for host_id in dict.fromkeys(host_ids):
+        obj = lookup_video(host_id)
+        if obj is UNCACHED:
+            pending.append(host_id)
+        else:
+            found[host_id] = (obj, None)
+    await asyncio.gather(*(fetch(host_id) for host_id in pending))
+    return found
+
+
+async def get_playlist(db_id):
+    return await _first(Playlist, db_id=_as_uuid(db_id))
+
+
+async def get_user(user_id):
+    user_id = _as_uuid(user_id)
+    email = user_email_cache.get(user_id)
+    if email is None:
+        lookup = await _first(UserById, user_id=user_id)
+        if lookup is None:
+            return None
+        email = user_email_cache.set(user_id, lookup.email)
+    return await _first(User, email=email, user_id=user_id)
+
+
+async def get_watched_fractions(user_id, host_ids, chunk_size=100):
+    """
+    `{host_id: watched fraction}` for the videos `user_id` has started.
+    Positions share the user's partition, so each chunk of host ids is
+    one single-partition IN read.
+    """
+    user_id = _as_uuid(user_id)
+    host_ids = list(dict.fromkeys(host_ids))
+    storage = get_storage()
+    chunks = await asyncio.gather(*(
+        storage.aexecute(
+            Select(WatchPosition, {"user_id": user_id, "host_id": host_ids[start:start + chunk_size]},
+                   columns=["host_id", "end_time", "duration", "complete"]),
+            execution_profile=EXEC_PROFILE_POINT_READ)
+        for start in range(0, len(host_ids), chunk_size)))
+    return {row["host_id"]: watched_fraction(row["end_time"], row["duration"], row["complete"])
+            for rows in chunks for row in rows}
+
+
+async def get_playlist_progress(user_id, playlist_id):
+    """
+    Watch progress of `user_id` through a whole playlist, cached per
+    (user, playlist): one read of the playlist's host ids, then one read
+    per 100 distinct videos.
+    """
+    user_id, playlist_id = _as_uuid(user_id), _as_uuid(playlist_id)
+    key = (user_id, playlist_id)
+    progress = progress_cache.get(key)
+    if progress is None:
+        rows = await get_storage().aexecute(
+            Select(PlaylistItem, {"playlist_id": playlist_id}, columns=["host_id"]))
+        host_ids = [row["host_id"] for row in rows]
+        fractions = await get_watched_fractions(user_id, host_ids) if host_ids else {}
+        progress = progress_cache.set(key, summarize_progress(host_ids, fractions))
+    return progress
+
+
+async def get_resume_time(host_id, user_id):
+    user_id = _as_uuid(user_id)
+    key = (user_id, host_id)
+    resume_time = resume_cache.get(key)
+    if resume_time is None:
+        obj = await _first(WatchPosition, user_id=user_id, host_id=host_id)
+        resume_time = resume_cache.set(key, obj.resume_time if obj is not None else 0)
+    return resume_time
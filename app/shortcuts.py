@@ -1,27 +1,85 @@
-from cassandra.cqlengine.query import DoesNotExist, MultipleObjectsReturned
+import hashlib
+import json
+import os
+
 from fastapi import Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from app import config
+from app.cache import LRUCache
+from app.storage import get_storage
 
 
 settings = config.get_settings()
-templates = Jinja2Templates(directory=str(settings.templates_dir))
+
+
+class _BytecodeCache(FileSystemBytecodeCache):
+    """Creates its directory on the first write rather than at import."""
+
+    def dump_bytecode(self, bucket):
+        os.makedirs(self.directory, exist_ok=True)
+        super().dump_bytecode(bucket)
+
+
+# Compiled templates are shared on disk, so a new worker loads them
+# instead of parsing every template again.
+templates = Jinja2Templates(
+    directory=str(settings.templates_dir),
+    bytecode_cache=_BytecodeCache(str(settings.template_cache_dir)),
+)
+fragment_cache = LRUCache(maxsize=settings.fragment_cache_size, ttl=settings.fragment_cache_ttl)
+
+
+def precompile_templates():
+    """Compile every template into the bytecode cache; returns how many."""
+    names = templates.env.list_templates()
+    for name in names:
+        templates.get_template(name)
+    return len(names)
+
+
+def context_key(context):
+    """Stable digest of a fragment context."""
+    data = json.dumps(context, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
+
+
+def render_fragment(template_name, context={}, **kwargs):
+    """
+    Render a template that depends only on `context`, e.g. a video embed
+    or a link, reusing the HTML of an earlier call with the same context.
+    Templates call it as `{{ fragment("videos/htmx/link.html", path=...) }}`.
+    """
+    ctx = dict(context, **kwargs)
+    key = (template_name, context_key(ctx))
+    html_str = fragment_cache.get(key)
+    if html_str is None:
+        html_str = fragment_cache.set(key, Markup(templates.get_template(template_name).render(ctx)))
+    return html_str
+
+
+templates.env.globals["fragment"] = render_fragment
 
 
 def get_object_or_404(Classname, **kwargs):
-    video_obj = None
+    """The one `Classname` row matching `kwargs`: 404 without one, 400 with several."""
     try:
-        video_obj = Classname.objects.get(**kwargs)
-    except DoesNotExist:
-        raise StarletteHTTPException(status_code=404)
-    except MultipleObjectsReturned:
-        raise StarletteHTTPException(status_code=400)
-    except:
+        objs = get_storage().filter(Classname, kwargs, limit=2)
+    except Exception:
         raise StarletteHTTPException(status_code=500)
-    return video_obj
+    if len(objs) > 1:
+        raise StarletteHTTPException(status_code=400)
+    return object_or_404(objs[0] if objs else None)
+
+
+def object_or_404(obj):
+    if obj is None:
+        raise StarletteHTTPException(status_code=404)
+    return obj
 
 
 def redirect(path, cookies: dict = {}, remove_session=False):
@@ -45,5 +103,5 @@ def render(request, template_name, context={}, status_code: int = 200, cookies:
     return response
 
 
-def is_htmx(request: Request):
+async def is_htmx(request: Request):
     return request.headers.get("hx-request") == 'true'
@@ -0,0 +1,40 @@
+"""
+Storage backends the models read and write through.
+
+`storage_backend` picks one: "cassandra" (the default) runs every
+statement as CQL against the cluster configured in `app.db`; "memory"
+keeps everything in process, optionally with `storage_latency` seconds
+of simulated latency per request, so the app and its benchmarks run
+without a cluster.
+"""
+from app.config import get_settings
+from .base import Batch, Delete, Insert, Select, Storage, insert, key_of
+
+settings = get_settings()
+
+_storage = None
+
+
+def create_storage(backend=None):
+    backend = backend or settings.storage_backend
+    if backend == "cassandra":
+        from .cql import CassandraStorage
+        return CassandraStorage()
+    if backend == "memory":
+        from .memory import MemoryStorage
+        return MemoryStorage(latency=settings.storage_latency, jitter=settings.storage_latency_jitter)
+    raise ValueError(f"Unknown storage backend {backend!r}")
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage):
+    """Swap the process-wide backend, e.g. for a `MemoryStorage` in tests."""
+    global _storage
+    _storage = storage
+    return storage
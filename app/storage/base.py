@@ -0,0 +1,125 @@
+from collections import deque, namedtuple
+
+# Statements run by a `Storage`. `model` is a cqlengine Model class: its
+# table name, partition and clustering keys drive both backends.
+#
+# `where` maps key columns to a value, or to a list of values for IN.
+# A Select returns a list of row dicts; the others return whether they
+# were applied, which is only ever False for conditional writes.
+Select = namedtuple("Select", ["model", "where", "columns", "limit", "reverse"],
+                    defaults=(None, None, None, False))
+Insert = namedtuple("Insert", ["model", "values", "ttl", "timestamp", "if_not_exists"],
+                    defaults=(None, None, False))
+Delete = namedtuple("Delete", ["model", "where", "if_exists", "conditions"],
+                    defaults=(False, None))
+Batch = namedtuple("Batch", ["statements", "logged"], defaults=(True,))
+
+
+def insert(obj, ttl=None, timestamp=None, if_not_exists=False):
+    """
+    An Insert of the set columns of model instance `obj`. Like a
+    cqlengine save, unset columns and empty collections are left alone
+    rather than written as tombstones.
+    """
+    obj.validate()
+    values = {}
+    for name in obj._columns:
+        value = getattr(obj, name)
+        if value is None or (isinstance(value, (list, set, dict)) and not value):
+            continue
+        values[name] = value
+    return Insert(type(obj), values, ttl=ttl, timestamp=timestamp, if_not_exists=if_not_exists)
+
+
+def key_of(obj):
+    """The primary key of model instance `obj`, as a `where`."""
+    return {name: getattr(obj, name) for name in obj._primary_keys}
+
+
+def _outcome(future):
+    try:
+        return True, future.result()
+    except Exception as e:
+        return False, e
+
+
+class Storage:
+    """
+    Where the models read and write. Backends implement `execute_async`,
+    `aexecute`, `apage` and `scan`; everything else is built on them.
+
+    `execution_profile` names one of the driver profiles in `app.db`.
+    Backends without such a notion ignore it.
+    """
+    name = None
+
+    def connect(self):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def execute_async(self, statement, execution_profile=None):
+        """Start `statement`; returns a future whose `result()` is its result."""
+        raise NotImplementedError
+
+    async def aexecute(self, statement, execution_profile=None):
+        raise NotImplementedError
+
+    async def apage(self, select, page_size=100, paging_state=None, execution_profile=None):
+        """One page of `select` and the opaque paging state of the next, or None."""
+        raise NotImplementedError
+
+    def scan(self, model, columns=None, fetch_size=5000):
+        """Every row of `model`'s table as instances, fetched lazily."""
+        raise NotImplementedError
+
+    def execute(self, statement, execution_profile=None):
+        return self.execute_async(statement, execution_profile=execution_profile).result()
+
+    def execute_concurrent(self, statements, concurrency=100, execution_profile=None):
+        """
+        Run `statements` with up to `concurrency` of them in flight,
+        starting the next one whenever one is done, and return
+        `(success, result or exception)` for each in order, like the
+        driver's `execute_concurrent`. This version waits for the oldest
+        request; backends that can be told of completions do better.
+        """
+        results = []
+        in_flight = deque()
+        for statement in statements:
+            if len(in_flight) >= concurrency:
+                results.append(_outcome(in_flight.popleft()))
+            in_flight.append(self.execute_async(statement, execution_profile=execution_profile))
+        while in_flight:
+            results.append(_outcome(in_flight.popleft()))
+        return results
+
+    def get(self, model, **where):
+        """The first `model` row matching `where`, or None."""
+        rows = self.execute(Select(model, where, limit=1))
+        return model._construct_instance(rows[0]) if rows else None
+
+    def filter(self, model, where, columns=None, limit=None, reverse=False):
+        rows = self.execute(Select(model, where, columns=columns, limit=limit, reverse=reverse))
+        return [model._construct_instance(row) for row in rows]
+
+    def save(self, obj, ttl=None, timestamp=None, if_not_exists=False):
+        return self.execute(insert(obj, ttl=ttl, timestamp=timestamp, if_not_exists=if_not_exists))
+
+    def delete(self, model, **where):
+        return self.execute(Delete(model, where))
+
+    def batch(self, statements, logged=True):
+        return self.execute(Batch(list(statements), logged=logged))
+
+    async def aget(self, model, execution_profile=None, **where):
+        rows = await self.aexecute(Select(model, where, limit=1), execution_profile=execution_profile)
+        return model._construct_instance(rows[0]) if rows else None
+
+    async def afilter(self, model, where, columns=None, limit=None, reverse=False,
+                      execution_profile=None):
+        rows = await self.aexecute(
+            Select(model, where, columns=columns, limit=limit, reverse=reverse),
+            execution_profile=execution_profile)
+        return [model._construct_instance(row) for row in rows]
@@ -0,0 +1,147 @@
+from cassandra import concurrent
+from cassandra.cqlengine import connection
+from cassandra.query import BatchStatement, BatchType, SimpleStatement
+
+from app import aio, db
+from .base import Batch, Delete, Insert, Select, Storage
+
+
+def _where(where):
+    clauses, params = [], []
+    for name, value in where.items():
+        if isinstance(value, (list, tuple, set, frozenset)):
+            clauses.append(f"{name} IN ?")
+            params.append(list(value))
+        else:
+            clauses.append(f"{name} = ?")
+            params.append(value)
+    return " AND ".join(clauses), params
+
+
+def to_cql(statement):
+    """The CQL string and bind parameters of a storage statement."""
+    table = statement.model.column_family_name()
+    if isinstance(statement, Select):
+        query = f"SELECT {', '.join(statement.columns or ['*'])} FROM {table}"
+        params = []
+        if statement.where:
+            clauses, params = _where(statement.where)
+            query = f"{query} WHERE {clauses}"
+        if statement.reverse and statement.model._clustering_keys:
+            name, column = next(iter(statement.model._clustering_keys.items()))
+            order = "ASC" if (column.clustering_order or "").upper() == "DESC" else "DESC"
+            query = f"{query} ORDER BY {name} {order}"
+        if statement.limit:
+            query = f"{query} LIMIT ?"
+            params.append(statement.limit)
+        return query, params
+    if isinstance(statement, Insert):
+        names = list(statement.values)
+        query = (f"INSERT INTO {table} ({', '.join(names)}) "
+                 f"VALUES ({', '.join('?' for _ in names)})")
+        params = list(statement.values.values())
+        if statement.if_not_exists:
+            query = f"{query} IF NOT EXISTS"
+        using = []
+        if statement.ttl:
+            using.append("TTL ?")
+            params.append(statement.ttl)
+        if statement.timestamp is not None:
+            using.append("TIMESTAMP ?")
+            params.append(statement.timestamp)
+        if using:
+            query = f"{query} USING {' AND '.join(using)}"
+        return query, params
+    if isinstance(statement, Delete):
+        clauses, params = _where(statement.where)
+        query = f"DELETE FROM {table} WHERE {clauses}"
+        if statement.conditions:
+            query = f"{query} IF {' AND '.join(f'{name} = ?' for name in statement.conditions)}"
+            params.extend(statement.conditions.values())
+        elif statement.if_exists:
+            query = f"{query} IF EXISTS"
+        return query, params
+    raise TypeError(f"Not a storage statement: {statement!r}")
+
+
+def _is_conditional(statement):
+    return getattr(statement, "if_not_exists", False) or getattr(statement, "if_exists", False) \
+        or bool(getattr(statement, "conditions", None))
+
+
+def _bind(statement):
+    """A driver statement and its parameters."""
+    if isinstance(statement, Batch):
+        batch_type = BatchType.LOGGED if statement.logged else BatchType.UNLOGGED
+        batch = BatchStatement(batch_type=batch_type)
+        for child in statement.statements:
+            query, params = to_cql(child)
+            batch.add(db.prepare(query), params)
+        return batch, None
+    query, params = to_cql(statement)
+    return db.prepare(query), params
+
+
+def _result(statement, rows):
+    if isinstance(statement, Select):
+        return list(rows)
+    return rows.was_applied if _is_conditional(statement) else True
+
+
+class _Result:
+    def __init__(self, response_future, statement):
+        self.response_future = response_future
+        self.statement = statement
+
+    def result(self):
+        return _result(self.statement, self.response_future.result())
+
+
+def _profile(execution_profile):
+    return {} if execution_profile is None else {"execution_profile": execution_profile}
+
+
+class CassandraStorage(Storage):
+    """Statements as prepared CQL on the cqlengine connection."""
+    name = "cassandra"
+
+    def connect(self):
+        db.get_session()
+
+    def shutdown(self):
+        db.shutdown()
+
+    def execute_async(self, statement, execution_profile=None):
+        query, params = _bind(statement)
+        response_future = connection.get_session().execute_async(
+            query, params, **_profile(execution_profile))
+        return _Result(response_future, statement)
+
+    def execute_concurrent(self, statements, concurrency=100, execution_profile=None):
+        # The driver starts the next request from the callback of each
+        # one that finishes.
+        statements = list(statements)
+        results = concurrent.execute_concurrent(
+            connection.get_session(), [_bind(statement) for statement in statements],
+            concurrency=concurrency, raise_on_first_error=False, **_profile(execution_profile))
+        return [(success, _result(statement, result) if success else result)
+                for statement, (success, result) in zip(statements, results)]
+
+    async def aexecute(self, statement, execution_profile=None):
+        query, params = _bind(statement)
+        rows = await aio.execute(query, params, **_profile(execution_profile))
+        if isinstance(statement, Select):
+            return rows
+        return rows[0]["[applied]"] if _is_conditional(statement) else True
+
+    async def apage(self, select, page_size=100, paging_state=None, execution_profile=None):
+        query, params = to_cql(select)
+        return await aio.execute_page(query, params, page_size=page_size,
+                                      paging_state=paging_state, **_profile(execution_profile))
+
+    def scan(self, model, columns=None, fetch_size=5000):
+        query, _ = to_cql(Select(model, None, columns=columns))
+        rows = connection.get_session().execute(
+            SimpleStatement(query, fetch_size=fetch_size), execution_profile=db.EXEC_PROFILE_SCAN)
+        for row in rows:
+            yield model._construct_instance(row)
@@ -0,0 +1,336 @@
+"""
+In-process storage with Cassandra's data model, for running the app
+and its benchmarks without a cluster.
+
+Rows live in partitions keyed by the partition key columns, each kept
+sorted by its clustering columns in their declared order; TimeUUIDs sort
+by time as they do in Cassandra, and full-table reads go partition by
+partition in hashed "token" order. Writes are upserts that merge columns,
+resolved by write timestamp, with TTLs and conditional writes. Selects
+must name the whole partition key, or nothing at all, just as Cassandra
+refuses them without ALLOW FILTERING.
+
+Every request can be made to take `latency` seconds (plus up to
+`jitter`). Futures from `execute_async` only become ready that long
+after they were started, so concurrent requests overlap the way they do
+against a real cluster.
+"""
+import asyncio
+import bisect
+import copy
+import hashlib
+import heapq
+import random
+import threading
+import time
+
+from cassandra import InvalidRequest
+from cassandra.cqlengine import columns
+
+from .base import Batch, Delete, Insert, Select, Storage, _outcome
+
+
+class _Reversed:
+    """Sorts in the opposite order of the value it wraps."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def _token(partition_key):
+    digest = hashlib.blake2b(repr(partition_key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _values(value):
+    return list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+
+
+class _Row:
+    __slots__ = ("values", "timestamp", "expires")
+
+    def __init__(self, values, timestamp, expires):
+        self.values = values
+        self.timestamp = timestamp
+        self.expires = expires
+
+    def live(self, now):
+        return self.expires is None or self.expires > now
+
+
+class _Table:
+    def __init__(self, model):
+        self.name = model.column_family_name()
+        self.partition_keys = list(model._partition_keys)
+        self.clustering_keys = list(model._clustering_keys)
+        self.primary_keys = self.partition_keys + self.clustering_keys
+        self._sort_keys = [self._sort_key(column) for column in model._clustering_keys.values()]
+        # partition key -> {clustering key: _Row}, its clustering keys in
+        # order and their sort keys
+        self.partitions = {}
+        self.orders = {}
+        self.sorts = {}
+        # (token, partition key) of every partition, in token order
+        self.tokens = []
+
+    @staticmethod
+    def _sort_key(column):
+        key = (lambda value: (value.time, value.bytes)) if isinstance(column, columns.TimeUUID) \
+            else (lambda value: value)
+        if (column.clustering_order or "").upper() == "DESC":
+            return lambda value: _Reversed(key(value))
+        return key
+
+    def order_key(self, clustering_key):
+        return tuple(key(value) for key, value in zip(self._sort_keys, clustering_key))
+
+    def split(self, values):
+        return (tuple(values[name] for name in self.partition_keys),
+                tuple(values[name] for name in self.clustering_keys))
+
+    def check_key(self, values, names):
+        missing = [name for name in names if name not in values]
+        if missing:
+            raise InvalidRequest(f"{self.name}: missing key column(s) {', '.join(missing)}")
+
+    def check_where(self, where):
+        self.check_key(where, self.partition_keys)
+        extra = [name for name in where if name not in self.primary_keys]
+        if extra:
+            raise InvalidRequest(f"{self.name}: {', '.join(extra)} is not a key column")
+
+    def row(self, partition_key, clustering_key, now):
+        row = self.partitions.get(partition_key, {}).get(clustering_key)
+        return row if row is not None and row.live(now) else None
+
+    def put(self, partition_key, clustering_key, values, timestamp, expires):
+        rows = self.partitions.get(partition_key)
+        if rows is None:
+            rows = self.partitions[partition_key] = {}
+            self.orders[partition_key] = []
+            self.sorts[partition_key] = []
+            bisect.insort(self.tokens, (_token(partition_key), partition_key))
+        row = rows.get(clustering_key)
+        if row is None:
+            rows[clustering_key] = _Row(dict(values), timestamp, expires)
+            sort_key = self.order_key(clustering_key)
+            index = bisect.bisect(self.sorts[partition_key], sort_key)
+            self.sorts[partition_key].insert(index, sort_key)
+            self.orders[partition_key].insert(index, clustering_key)
+        elif timestamp >= row.timestamp:
+            row.values.update(values)
+            row.timestamp, row.expires = timestamp, expires
+
+    def remove(self, partition_key, clustering_key):
+        rows = self.partitions.get(partition_key)
+        if rows is None or clustering_key not in rows:
+            return
+        del rows[clustering_key]
+        index = bisect.bisect_left(self.sorts[partition_key], self.order_key(clustering_key))
+        del self.sorts[partition_key][index]
+        del self.orders[partition_key][index]
+        if not rows:
+            del self.partitions[partition_key]
+            del self.orders[partition_key]
+            del self.sorts[partition_key]
+            self.tokens.remove((_token(partition_key), partition_key))
+
+    def partition_keys_for(self, where):
+        if not where:
+            return [partition_key for _, partition_key in self.tokens]
+        self.check_where(where)
+        keys = [()]
+        for name in self.partition_keys:
+            keys = [key + (value,) for key in keys for value in _values(where[name])]
+        return list(dict.fromkeys(keys))
+
+    def iter_rows(self, where, reverse, now):
+        """
+        (partition key, clustering key, row) of every live row matching
+        `where`. Expired rows are skipped, not purged, so the partition can
+        be walked without copying it.
+        """
+        where = where or {}
+        clustering = [(index, set(_values(where[name])))
+                      for index, name in enumerate(self.clustering_keys) if name in where]
+        exact = None
+        if self.clustering_keys and len(clustering) == len(self.clustering_keys):
+            # Whole clustering keys: look the rows up instead of walking
+            # the partition.
+            exact = [()]
+            for _, allowed in clustering:
+                exact = [key + (value,) for key in exact for value in allowed]
+            exact.sort(key=self.order_key, reverse=reverse)
+        for partition_key in self.partition_keys_for(where):
+            rows = self.partitions.get(partition_key)
+            if rows is None:
+                continue
+            order = self.orders[partition_key]
+            if exact is not None:
+                order = [key for key in exact if key in rows]
+            for clustering_key in (reversed(order) if reverse and exact is None else order):
+                if any(clustering_key[index] not in allowed for index, allowed in clustering):
+                    continue
+                row = rows[clustering_key]
+                if row.live(now):
+                    yield partition_key, clustering_key, row
+
+
+class _Ready:
+    """A future that holds its outcome back until `ready_at`."""
+
+    def __init__(self, ready_at, value=None, error=None):
+        self.ready_at = ready_at
+        self.value = value
+        self.error = error
+
+    def result(self):
+        delay = self.ready_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class MemoryStorage(Storage):
+    name = "memory"
+
+    def __init__(self, latency=0.0, jitter=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._tables = {}
+        self._lock = threading.RLock()
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+    def _table(self, model):
+        name = model.column_family_name()
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = _Table(model)
+        return table
+
+    def _delay(self):
+        self.requests += 1
+        return self.latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _row_values(self, values, names):
+        names = names or values
+        return {name: copy.copy(values.get(name)) for name in names}
+
+    def _select(self, select, start=0, stop=None):
+        with self._lock:
+            table = self._table(select.model)
+            now = time.time()
+            rows = []
+            for index, (partition_key, clustering_key, row) in enumerate(
+                    table.iter_rows(select.where, select.reverse, now)):
+                if index < start:
+                    continue
+                if (stop is not None and index >= stop) or \
+                        (select.limit and len(rows) >= select.limit):
+                    return rows, True
+                rows.append(self._row_values(row.values, select.columns))
+            return rows, False
+
+    def _insert(self, statement, now):
+        table = self._table(statement.model)
+        table.check_key(statement.values, table.primary_keys)
+        partition_key, clustering_key = table.split(statement.values)
+        if statement.if_not_exists and table.row(partition_key, clustering_key, now) is not None:
+            return False
+        timestamp = statement.timestamp if statement.timestamp is not None else int(now * 1e6)
+        expires = now + statement.ttl if statement.ttl else None
+        values = {name: copy.copy(value) for name, value in statement.values.items()}
+        table.put(partition_key, clustering_key, values, timestamp, expires)
+        return True
+
+    def _delete(self, statement, now):
+        table = self._table(statement.model)
+        table.check_where(statement.where)
+        if statement.if_exists or statement.conditions:
+            table.check_key(statement.where, table.primary_keys)
+            row = table.row(*table.split(statement.where), now)
+            if row is None:
+                return False
+            if statement.conditions and any(row.values.get(name) != value
+                                            for name, value in statement.conditions.items()):
+                return False
+        for partition_key, clustering_key, _ in list(table.iter_rows(statement.where, False, now)):
+            table.remove(partition_key, clustering_key)
+        return True
+
+    def _apply(self, statement):
+        with self._lock:
+            now = time.time()
+            if isinstance(statement, Select):
+                return self._select(statement)[0]
+            if isinstance(statement, Insert):
+                return self._insert(statement, now)
+            if isinstance(statement, Delete):
+                return self._delete(statement, now)
+            if isinstance(statement, Batch):
+                for child in statement.statements:
+                    self._apply(child)
+                return True
+        raise TypeError(f"Not a storage statement: {statement!r}")
+
+    def execute_async(self, statement, execution_profile=None):
+        ready_at = time.monotonic() + self._delay()
+        try:
+            return _Ready(ready_at, value=self._apply(statement))
+        except Exception as e:
+            return _Ready(ready_at, error=e)
+
+    def execute_concurrent(self, statements, concurrency=100, execution_profile=None):
+        # Every future knows when it will be ready, so the next request
+        # starts as soon as the first of those in flight is done.
+        results = {}
+        in_flight = []
+        for index, statement in enumerate(statements):
+            if len(in_flight) >= concurrency:
+                _, done, future = heapq.heappop(in_flight)
+                results[done] = _outcome(future)
+            future = self.execute_async(statement)
+            heapq.heappush(in_flight, (future.ready_at, index, future))
+        while in_flight:
+            _, done, future = heapq.heappop(in_flight)
+            results[done] = _outcome(future)
+        return [results[index] for index in range(len(results))]
+
+    async def aexecute(self, statement, execution_profile=None):
+        delay = self._delay()
+        result = self._apply(statement)
+        if delay:
+            await asyncio.sleep(delay)
+        return result
+
+    async def apage(self, select, page_size=100, paging_state=None, execution_profile=None):
+        # The paging state is the number of rows already returned.
+        start = int(paging_state) if paging_state else 0
+        delay = self._delay()
+        rows, more = self._select(select, start, start + page_size)
+        if delay:
+            await asyncio.sleep(delay)
+        return rows, str(start + page_size).encode() if more else None
+
+    def scan(self, model, columns=None, fetch_size=5000):
+        start = 0
+        while True:
+            rows, more = self._select(Select(model, None, columns=columns), start, start + fetch_size)
+            for row in rows:
+                yield model._construct_instance(row)
+            if not more:
+                return
+            start += fetch_size
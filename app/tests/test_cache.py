@@ -0,0 +1,52 @@
+import time
+
+from app.cache import LRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+
+def test_entries_expire():
+    cache = LRUCache(maxsize=10, ttl=60)
+    cache.set("a", 1, ttl=0.01)
+    cache.set("b", 2)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_video_cache_round_trip():
+    from app.videos.models import (
+        UNCACHED, Video, cache_video, invalidate_video, lookup_video)
+
+    assert lookup_video("missing") is UNCACHED
+    cache_video("missing", None)
+    assert lookup_video("missing") is None
+    cache_video("abc", Video(host_id="abc", url="https://youtu.be/abc", title="t"))
+    first = lookup_video("abc")
+    first.title = "changed"
+    assert lookup_video("abc").title == "t"
+    invalidate_video("abc", "missing")
+    assert lookup_video("abc") is UNCACHED
+    assert lookup_video("missing") is UNCACHED
+
+
+def test_fragments_are_cached_by_context():
+    from app.shortcuts import context_key, fragment_cache, render_fragment
+
+    assert context_key({"a": 1, "b": 2}) == context_key({"b": 2, "a": 1})
+    fragment_cache.clear()
+    html = render_fragment("videos/htmx/link.html", path="/videos/abc", title="<t>")
+    assert html == render_fragment("videos/htmx/link.html", {"title": "<t>", "path": "/videos/abc"})
+    assert "&lt;t&gt;" in html
+    assert len(fragment_cache) == 1
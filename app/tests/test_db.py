@@ -0,0 +1,20 @@
+from cassandra import ConsistencyLevel
+from cassandra.cluster import EXEC_PROFILE_DEFAULT
+from cassandra.policies import ConstantSpeculativeExecutionPolicy, TokenAwarePolicy
+from cassandra.query import dict_factory
+
+from app import db
+
+
+def test_execution_profiles():
+    profiles = db.execution_profiles()
+    assert set(profiles) == {EXEC_PROFILE_DEFAULT, db.EXEC_PROFILE_POINT_READ,
+                             db.EXEC_PROFILE_SCAN, db.EXEC_PROFILE_HEARTBEAT}
+    for profile in profiles.values():
+        assert isinstance(profile.load_balancing_policy, TokenAwarePolicy)
+        assert profile.row_factory is dict_factory
+    point_read = profiles[db.EXEC_PROFILE_POINT_READ]
+    assert isinstance(point_read.speculative_execution_policy, ConstantSpeculativeExecutionPolicy)
+    assert point_read.request_timeout < profiles[EXEC_PROFILE_DEFAULT].request_timeout
+    assert profiles[db.EXEC_PROFILE_SCAN].request_timeout > profiles[EXEC_PROFILE_DEFAULT].request_timeout
+    assert profiles[db.EXEC_PROFILE_HEARTBEAT].consistency_level == ConsistencyLevel.LOCAL_ONE
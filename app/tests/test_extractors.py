@@ -0,0 +1,30 @@
+import pytest
+
+from app.videos.extractors import extract, extract_video_id
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("https://www.youtube.com/watch?v=KQ-u4RcFLBY", ("youtube", "KQ-u4RcFLBY")),
+    ("http://www.youtube.com/watch?feature=feedu&v=nNpvWBuTfrc", ("youtube", "nNpvWBuTfrc")),
+    ("https://youtu.be/nNpvWBuTfrc?t=10", ("youtube", "nNpvWBuTfrc")),
+    ("youtube.com/embed/nNpvWBuTfrc", ("youtube", "nNpvWBuTfrc")),
+    ("http://www.youtube.com/v/nNpvWBuTfrc?version=3&amp;hl=en_US", ("youtube", "nNpvWBuTfrc")),
+    ("https://www.youtube.com/shorts/nNpvWBuTfrc", ("youtube", "nNpvWBuTfrc")),
+    ("https://m.youtube.com/watch?v=nNpvWBuTfrc", ("youtube", "nNpvWBuTfrc")),
+    ("https://music.youtube.com/watch?v=nNpvWBuTfrc&list=RD", ("youtube", "nNpvWBuTfrc")),
+    ("https://vimeo.com/76979871", ("vimeo", "76979871")),
+    ("https://player.vimeo.com/video/76979871?h=abc", ("vimeo", "76979871")),
+    ("https://www.dailymotion.com/video/x8abc12", ("dailymotion", "x8abc12")),
+    ("https://dai.ly/x8abc12", ("dailymotion", "x8abc12")),
+])
+def test_supported_urls(url, expected):
+    assert extract(url) == expected
+    assert extract_video_id(url) == expected[1]
+
+
+@pytest.mark.parametrize("url", [
+    "", "not a url", "https://www.youtube.com/watch", "https://www.youtube.com/watch?v=short",
+    "https://example.com/watch?v=nNpvWBuTfrc", "https://vimeo.com/channels/staffpicks",
+])
+def test_unsupported_urls(url):
+    assert extract(url) is None
@@ -0,0 +1,50 @@
+import asyncio
+import io
+
+from starlette.datastructures import UploadFile
+
+from app.videos import imports
+
+
+def run_import(data, monkeypatch, concurrency=2, max_rows=None):
+    added = []
+
+    def add_video(url, user_id, host_service, host_id, title):
+        added.append((host_id, title))
+        return "created"
+
+    monkeypatch.setattr(imports, "_add_video", add_video)
+
+    async def collect():
+        upload = UploadFile(io.BytesIO(data), filename="videos.csv")
+        rows = imports.parse_rows(imports.iter_lines(upload, chunk_size=7))
+        return [r async for r in imports.import_videos(
+            rows, "user", concurrency=concurrency, max_rows=max_rows)]
+
+    return asyncio.run(collect()), added
+
+
+def test_csv_with_header(monkeypatch):
+    data = ("\ufefftitle,url\r\n"
+            "First,https://youtu.be/aaaaaaaaaaa\r\n"
+            "\r\n"
+            "\"Second, again\",https://www.youtube.com/watch?v=bbbbbbbbbbb\r\n").encode()
+    results, added = run_import(data, monkeypatch)
+    assert sorted(added) == [("aaaaaaaaaaa", "First"), ("bbbbbbbbbbb", "Second, again")]
+    assert sorted(r["line"] for r in results) == [2, 4]
+
+
+def test_plain_list_reports_every_line(monkeypatch):
+    data = b"https://youtu.be/aaaaaaaaaaa\nnot a url\nhttps://youtube.com/watch?v=aaaaaaaaaaa\nhttps://youtu.be/ccccccccccc"
+    results, added = run_import(data, monkeypatch)
+    by_line = {r["line"]: r["status"] for r in results}
+    assert by_line == {1: "created", 2: "invalid", 3: "duplicate", 4: "created"}
+    assert [host_id for host_id, _ in added] == ["aaaaaaaaaaa", "ccccccccccc"]
+
+
+def test_stops_at_max_rows(monkeypatch):
+    data = "".join(f"https://youtu.be/{c * 11}\n" for c in "abcdef").encode()
+    results, added = run_import(data, monkeypatch, max_rows=2)
+    assert [host_id for host_id, _ in added] == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+    assert [r["status"] for r in results].count("truncated") == 1
+    assert len(results) == 3
@@ -0,0 +1,22 @@
+from cassandra.cqlengine.models import Model
+
+from app.migrations.runner import pending_migrations
+from app.migrations.versions import LATEST_VERSION, MIGRATIONS, _models
+
+
+def test_versions_are_sequential():
+    assert [m.version for m in MIGRATIONS] == list(range(1, LATEST_VERSION + 1))
+    assert len({m.name for m in MIGRATIONS}) == len(MIGRATIONS)
+
+
+def test_every_model_has_a_migration():
+    declared = [table for m in MIGRATIONS for table in m.tables]
+    models = {name for name, obj in _models().items()
+              if isinstance(obj, type) and issubclass(obj, Model)}
+    assert sorted(declared) == sorted(models)
+
+
+def test_pending_migrations():
+    assert [m.version for m in pending_migrations(0)] == list(range(1, LATEST_VERSION + 1))
+    assert [m.version for m in pending_migrations(2, target=4)] == [3, 4]
+    assert pending_migrations(LATEST_VERSION) == []
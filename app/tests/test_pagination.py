@@ -0,0 +1,27 @@
+import pytest
+from starlette.exceptions import HTTPException
+
+from app.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    paging_state = b"\x00\x10opaque-driver-state\xff"
+    cursor = encode_cursor("videos", paging_state)
+    assert decode_cursor("videos", cursor) == paging_state
+    assert encode_cursor("videos", None) is None
+    assert decode_cursor("videos", None) is None
+
+
+def test_cursor_is_bound_to_its_listing():
+    cursor = encode_cursor("videos", b"state")
+    with pytest.raises(HTTPException):
+        decode_cursor("playlists", cursor)
+
+
+def test_tampered_cursor_is_rejected():
+    payload, signature = encode_cursor("videos", b"state").split(".")
+    forged = encode_cursor("videos", b"other").split(".")[0]
+    with pytest.raises(HTTPException):
+        decode_cursor("videos", f"{forged}.{signature}")
+    with pytest.raises(HTTPException):
+        decode_cursor("videos", "not-a-cursor")
@@ -0,0 +1,42 @@
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.authentication import AuthCredentials, AuthenticationBackend, SimpleUser
+from starlette.middleware.authentication import AuthenticationMiddleware
+
+from app.storage import set_storage
+from app.storage.memory import MemoryStorage
+from app.watch_events import playback
+from app.watch_events.buffer import WatchEventBuffer
+from app.watch_events.models import WatchPosition
+from app.watch_events.routers import router
+
+
+class UserBackend(AuthenticationBackend):
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+    async def authenticate(self, conn):
+        return AuthCredentials(["authenticated"]), SimpleUser(self.user_id)
+
+
+def test_binary_frames_do_not_end_the_session(monkeypatch):
+    buffer = WatchEventBuffer(flush_interval=60, flush_size=100)
+    monkeypatch.setattr(playback, "watch_event_buffer", buffer)
+    user_id = uuid.uuid4()
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(AuthenticationMiddleware, backend=UserBackend(str(user_id)))
+    with TestClient(app).websocket_connect("/ws/events/watch") as websocket:
+        websocket.send_text('{"host_id": "a", "duration": 100}')
+        websocket.send_text("t:12")
+        websocket.send_bytes(b"\x00\x01")
+        websocket.send_text("t:30")
+    # The position reached after the binary frame is saved on disconnect.
+    storage = set_storage(MemoryStorage())
+    try:
+        assert buffer.flush() == 1
+        assert storage.get(WatchPosition, user_id=user_id, host_id="a").end_time == 30.0
+    finally:
+        set_storage(None)
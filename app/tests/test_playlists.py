@@ -0,0 +1,71 @@
+import asyncio
+
+from app import repository
+from app.playlists.models import Playlist, PlaylistItem
+from app.playlists.positions import keys_after
+from app.storage import set_storage
+from app.storage.memory import MemoryStorage
+from app.videos.models import Video, invalidate_video
+
+
+def test_entries_keep_order_duplicates_and_failures(monkeypatch):
+    videos = {host_id: Video(host_id=host_id, title=host_id.upper()) for host_id in ("a", "b")}
+    calls = []
+
+    async def first(Classname, host_id):
+        calls.append(host_id)
+        if host_id == "broken":
+            raise TimeoutError("read timed out")
+        return videos.get(host_id)
+
+    monkeypatch.setattr(repository, "_first", first)
+    host_ids = ["a", "missing", "b", "a", "broken"]
+    invalidate_video(*host_ids)
+    items = [PlaylistItem(position=position, host_id=host_id)
+             for position, host_id in zip(keys_after(None, len(host_ids)), host_ids)]
+    found = asyncio.run(repository.get_videos([item.host_id for item in items]))
+    entries = Playlist.entries(items, found)
+    invalidate_video(*host_ids)
+
+    assert sorted(calls) == ["a", "b", "broken", "missing"]
+    assert [entry.position for entry in entries] == [item.position for item in items]
+    assert [entry.video.title if entry.video else None for entry in entries] == [
+        "A", None, "B", "A", None]
+    assert entries[1].error is None
+    assert isinstance(entries[4].error, TimeoutError)
+
+
+def test_progress_counts_each_video_once():
+    from app.playlists.models import summarize_progress
+    from app.watch_events.models import watched_fraction
+
+    assert watched_fraction(50, 100) == 0.5
+    assert watched_fraction(99, 100, complete=True) == 1.0
+    assert watched_fraction(120, 100) == 1.0
+    assert watched_fraction(None, 100) == 0.0
+    progress = summarize_progress(["a", "b", "a", "c"], {"a": 1.0, "b": 0.5})
+    assert progress["total"] == 3
+    assert progress["completed"] == 1
+    assert progress["percent"] == 50.0
+    assert progress["videos"]["c"] == 0.0
+    assert summarize_progress([], {})["percent"] == 0.0
+
+
+def test_append_videos_writes_in_chunks(monkeypatch):
+    storage = set_storage(MemoryStorage())
+    try:
+        sizes = []
+        batch = storage.batch
+
+        def record(statements, logged=True):
+            sizes.append(len(statements))
+            return batch(statements, logged=logged)
+
+        monkeypatch.setattr(storage, "batch", record)
+        playlist = Playlist(user_id=None, title="Import")
+        host_ids = [f"video{index:04d}" for index in range(250)]
+        playlist.append_videos(host_ids)
+        assert sizes == [100, 100, 50]
+        assert [item.host_id for item in playlist.get_items()] == host_ids
+    finally:
+        set_storage(None)
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from app.playlists.positions import key_between, keys_after, keys_before
+
+
+def test_appends_stay_short():
+    keys = keys_after(None, 5000)
+    assert keys == sorted(keys)
+    assert {len(key) for key in keys} == {8}
+
+
+def test_keys_before():
+    first = keys_after(None, 1)[0]
+    keys = keys_before(first, 3)
+    assert keys == sorted(keys) and keys[-1] < first
+    assert keys_before(None, 3)[-1] == first
+
+
+def test_random_inserts_keep_order():
+    rng = random.Random(0)
+    keys = [key_between()]
+    for _ in range(3000):
+        i = rng.randint(0, len(keys))
+        a = keys[i - 1] if i > 0 else None
+        b = keys[i] if i < len(keys) else None
+        key = key_between(a, b)
+        assert (a is None or a < key) and (b is None or key < b)
+        assert not key.endswith("0") or len(key) == 8
+        keys.insert(i, key)
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+
+def test_repeated_inserts_at_one_spot():
+    a, b = keys_after(None, 2)
+    for _ in range(200):
+        b = key_between(a, b)
+    assert a < b
+    assert len(b) < 60
+    with pytest.raises(ValueError):
+        key_between(b, a)
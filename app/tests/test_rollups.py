@@ -0,0 +1,19 @@
+import uuid
+
+from app.analytics.rollups import summarize
+
+
+def test_summarize_counts_sessions_once_across_runs():
+    user_a, user_b = uuid.uuid4(), uuid.uuid4()
+    first = summarize([user_a, user_a, user_b], [0, 0, 10], [5, 30, 99],
+                      [100, 100, 100], buckets=10)
+    assert first["sessions"] == 2
+    assert first["completed_sessions"] == 1
+    assert first["seconds_watched"] == 30 + 89
+    assert first["dropoff"].tolist() == [0, 0, 0, 1, 0, 0, 0, 0, 0, 1]
+
+    second = summarize([user_a], [0], [50], [100],
+                       open_sessions=first["open_sessions"], buckets=10)
+    assert second["sessions"] == 0
+    assert second["seconds_watched"] == 20
+    assert second["dropoff"].tolist() == [0, 0, 0, -1, 0, 1, 0, 0, 0, 0]
@@ -0,0 +1,39 @@
+from app.videos.search import VideoSearchIndex, tokenize
+
+
+def build():
+    index = VideoSearchIndex()
+    index.load([
+        ("KQ-u4RcFLBY", "Python Tutorial for Beginners"),
+        ("nNpvWBuTfrc", "Advanced Python: decorators"),
+        ("aaaaaaaaaaa", "Pythonic café recipes"),
+        ("bbbbbbbbbbb", None),
+    ])
+    return index
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Café, CRÈME-brûlée!") == ["cafe", "creme", "brulee"]
+
+
+def test_prefix_and_ranking():
+    index = build()
+    results = [host_id for host_id, _ in index.search("pyth")]
+    assert set(results) == {"KQ-u4RcFLBY", "nNpvWBuTfrc", "aaaaaaaaaaa"}
+    # Whole word matches outrank prefixes, leading words outrank later ones.
+    assert [host_id for host_id, _ in index.search("python")] == [
+        "KQ-u4RcFLBY", "nNpvWBuTfrc", "aaaaaaaaaaa"]
+    assert [host_id for host_id, _ in index.search("python dec")] == ["nNpvWBuTfrc"]
+    assert [host_id for host_id, _ in index.search("cafe")] == ["aaaaaaaaaaa"]
+    assert [host_id for host_id, _ in index.search("KQ-u4")] == ["KQ-u4RcFLBY"]
+    assert index.search("") == []
+
+
+def test_updates_replace_old_tokens():
+    index = build()
+    index.add("nNpvWBuTfrc", "Rust ownership")
+    assert [host_id for host_id, _ in index.search("decorators")] == []
+    assert index.search("rust") == [("nNpvWBuTfrc", "Rust ownership")]
+    index.remove("nNpvWBuTfrc")
+    assert index.search("rust") == []
+    assert index.stats()["videos"] == 3
@@ -0,0 +1,102 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from cassandra import InvalidRequest
+
+from app.playlists.models import PlaylistByUser, PlaylistItem
+from app.storage import Batch, Delete, Insert, Select, insert
+from app.storage.memory import MemoryStorage
+from app.users.models import UserEmail
+from app.watch_events.models import WatchPosition
+
+
+def test_clustering_order_and_paging():
+    storage = MemoryStorage()
+    user_id = uuid.uuid4()
+    db_ids = [uuid.uuid1() for _ in range(5)]
+    # TimeUUIDs sort by time, newest first for a DESC clustering column.
+    for db_id in reversed(db_ids):
+        storage.save(PlaylistByUser(user_id=user_id, db_id=db_id, title=str(db_id)))
+    storage.save(PlaylistByUser(user_id=uuid.uuid4(), db_id=uuid.uuid1(), title="other"))
+    rows = storage.filter(PlaylistByUser, {"user_id": user_id})
+    assert [row.db_id for row in rows] == db_ids[::-1]
+    assert storage.filter(PlaylistByUser, {"user_id": user_id}, limit=1, reverse=True)[0].db_id == db_ids[0]
+
+    select = Select(PlaylistByUser, {"user_id": user_id})
+    seen, paging_state = [], None
+    while True:
+        page, paging_state = asyncio.run(storage.apage(select, page_size=2, paging_state=paging_state))
+        seen.extend(row["db_id"] for row in page)
+        if paging_state is None:
+            break
+    assert seen == db_ids[::-1]
+    assert len(list(storage.scan(PlaylistByUser, fetch_size=2))) == 6
+
+
+def test_upserts_timestamps_and_ttl():
+    storage = MemoryStorage()
+    user_id = uuid.uuid4()
+    key = {"user_id": user_id, "host_id": "a"}
+    storage.execute(Insert(WatchPosition, dict(key, end_time=20.0), timestamp=200))
+    storage.execute(Insert(WatchPosition, dict(key, end_time=10.0, duration=60.0), timestamp=100))
+    assert storage.get(WatchPosition, **key).end_time == 20.0
+    storage.execute(Insert(WatchPosition, dict(key, duration=90.0), timestamp=300))
+    obj = storage.get(WatchPosition, **key)
+    assert (obj.end_time, obj.duration) == (20.0, 90.0)
+
+    storage.execute(Insert(WatchPosition, {"user_id": user_id, "host_id": "b"}, ttl=0.05))
+    rows = storage.execute(Select(WatchPosition, {"user_id": user_id, "host_id": ["a", "b"]},
+                                  columns=["host_id"]))
+    assert rows == [{"host_id": "a"}, {"host_id": "b"}]
+    time.sleep(0.06)
+    assert storage.get(WatchPosition, user_id=user_id, host_id="b") is None
+
+
+def test_conditional_writes_and_deletes():
+    storage = MemoryStorage()
+    first, second = uuid.uuid4(), uuid.uuid4()
+    assert storage.save(UserEmail(email="a@b.c", user_id=first), if_not_exists=True)
+    assert not storage.save(UserEmail(email="a@b.c", user_id=second), if_not_exists=True)
+    assert not storage.execute(Delete(UserEmail, {"email": "a@b.c"}, conditions={"user_id": second}))
+    assert storage.execute(Delete(UserEmail, {"email": "a@b.c"}, conditions={"user_id": first}))
+    assert not storage.execute(Delete(UserEmail, {"email": "a@b.c"}, if_exists=True))
+
+    playlist_id = uuid.uuid4()
+    items = [PlaylistItem(playlist_id=playlist_id, position=position, host_id="h")
+             for position in ("b", "a", "c")]
+    storage.batch([insert(item) for item in items], logged=False)
+    assert [item.position for item in storage.filter(PlaylistItem, {"playlist_id": playlist_id})] == ["a", "b", "c"]
+    storage.execute(Batch([Delete(PlaylistItem, {"playlist_id": playlist_id})]))
+    assert storage.filter(PlaylistItem, {"playlist_id": playlist_id}) == []
+
+
+def test_queries_need_the_partition_key():
+    storage = MemoryStorage()
+    with pytest.raises(InvalidRequest):
+        storage.filter(PlaylistItem, {"host_id": "a"})
+    with pytest.raises(InvalidRequest):
+        storage.save(PlaylistItem(position="a", host_id="a"))
+
+
+def test_latency_overlaps_concurrent_requests():
+    storage = MemoryStorage(latency=0.05)
+    start = time.monotonic()
+    futures = [storage.execute_async(Select(UserEmail, {"email": str(n)})) for n in range(10)]
+    assert [future.result() for future in futures] == [[]] * 10
+    assert time.monotonic() - start < 0.25
+    assert storage.requests == 10
+
+
+def test_execute_concurrent_keeps_a_full_window():
+    storage = MemoryStorage(latency=0.05)
+    storage.save(UserEmail(email="0", user_id=uuid.uuid4()))
+    statements = [Select(UserEmail, {"email": str(n)}) for n in range(8)]
+    statements.insert(3, Select(PlaylistItem, {"host_id": "a"}))
+    start = time.monotonic()
+    results = storage.execute_concurrent(statements, concurrency=3)
+    assert time.monotonic() - start < 0.25
+    assert [success for success, _ in results] == [True] * 3 + [False] + [True] * 5
+    assert isinstance(results[3][1], InvalidRequest)
+    assert len(results[0][1]) == 1 and results[1][1] == []
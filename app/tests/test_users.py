@@ -1,16 +1,14 @@
 import pytest
-from app import db
+from app.storage import get_storage, set_storage
+from app.storage.memory import MemoryStorage
 from app.users.models import User
 
 
 @pytest.fixture(scope="module")
 def setup():
-    session = db.get_session()
-    yield session
-    q = User.objects.filter(email="test@test.com")
-    if q.count() != 0:
-        q.delete()
-    session.shutdown()
+    storage = set_storage(MemoryStorage())
+    yield storage
+    set_storage(None)
 
 
 def test_create_user(setup):
@@ -23,9 +21,9 @@ def test_duplicate_user(setup):
 
 
 def test_valid_password(setup):
-    q = User.objects.filter(email='test@test.com')
-    assert q.count() == 1
-    user_obj = q.first()
+    users = get_storage().filter(User, {"email": "test@test.com"})
+    assert len(users) == 1
+    user_obj = users[0]
     assert user_obj.verify_password('abc123') == True
     assert user_obj.verify_password('abc1234') == False
 
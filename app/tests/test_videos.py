@@ -0,0 +1,116 @@
+import pytest
+from starlette.exceptions import HTTPException
+
+from app.shortcuts import get_object_or_404
+from app.storage import set_storage
+from app.storage.memory import MemoryStorage
+from app.users.models import User
+from app.videos.exceptions import VideoAlreadyAddedException
+from app.videos.models import UNCACHED, Video, VideoByUser, lookup_video, video_cache
+from app.videos.search import search_index
+
+
+@pytest.fixture()
+def setup():
+    storage = set_storage(MemoryStorage())
+    video_cache.clear()
+    search_index.clear()
+    yield storage
+    video_cache.clear()
+    search_index.clear()
+    set_storage(None)
+
+
+def create_user(email):
+    return User.create_user(email=email, password="abc123").user_id
+
+
+def test_get_or_create_keeps_no_claim_on_existing_video(setup):
+    owner, other = create_user("owner@test.com"), create_user("other@test.com")
+    url = "https://www.youtube.com/watch?v=KQ-u4RcFLBY"
+    _, created = Video.get_or_create_video(url, user_id=owner)
+    assert created
+    video_cache.clear()
+    obj, created = Video.get_or_create_video(url, user_id=other)
+    assert not created and obj.user_id == owner
+    # The other user can still add the video themselves.
+    assert Video.add_video(url, user_id=other).user_id == other
+
+
+def test_failed_insert_releases_the_claim(setup, monkeypatch):
+    owner = create_user("retry@test.com")
+    url = "https://youtu.be/fffffffffff"
+
+    def fail(statements, logged=True):
+        raise ConnectionError("write timed out")
+
+    monkeypatch.setattr(setup, "batch", fail)
+    with pytest.raises(ConnectionError):
+        Video.add_video(url, user_id=owner)
+    with pytest.raises(ConnectionError):
+        Video.get_or_create_video(url, user_id=owner)
+    monkeypatch.undo()
+    assert Video.add_video(url, user_id=owner).user_id == owner
+
+
+def test_delete_keeps_other_users_rows_indexed(setup):
+    first, second = create_user("first@test.com"), create_user("second@test.com")
+    url = "https://www.youtube.com/watch?v=nNpvWBuTfrc"
+    Video.add_video(url, user_id=first, title="First upload")
+    Video.add_video(url, user_id=second, title="Second upload").delete_video()
+    rows = setup.filter(Video, {"host_id": "nNpvWBuTfrc"})
+    assert [obj.user_id for obj in rows] == [first]
+    assert search_index.search("upload") == [("nNpvWBuTfrc", "First upload")]
+    assert lookup_video("nNpvWBuTfrc").user_id == first
+    rows[0].delete_video()
+    assert search_index.search("upload") == []
+    assert lookup_video("nNpvWBuTfrc") is UNCACHED
+
+
+def test_update_video_url(setup):
+    owner = create_user("editor@test.com")
+    obj = Video.add_video("https://youtu.be/aaaaaaaaaaa", user_id=owner, title="Edited")
+    assert obj.update_video_url("https://youtu.be/bbbbbbbbbbb") == "https://youtu.be/bbbbbbbbbbb"
+    assert lookup_video("aaaaaaaaaaa") is UNCACHED
+    assert search_index.search("edited") == [("bbbbbbbbbbb", "Edited")]
+
+
+def test_url_edit_moves_the_row_and_claim(setup):
+    owner = create_user("mover@test.com")
+    old = Video.add_video("https://youtu.be/ggggggggggg", user_id=owner, title="Moving")
+    Video.add_video("https://youtu.be/hhhhhhhhhhh", user_id=owner)
+    with pytest.raises(VideoAlreadyAddedException):
+        old.update_video_url("https://youtu.be/hhhhhhhhhhh")
+    assert old.host_id == "ggggggggggg"
+    old.update_video_url("https://youtu.be/iiiiiiiiiii")
+    assert setup.filter(Video, {"host_id": "ggggggggggg"}) == []
+    assert [obj.db_id for obj in setup.filter(Video, {"host_id": "iiiiiiiiiii"})] == [old.db_id]
+    assert [obj.host_id for obj in setup.filter(VideoByUser, {"user_id": owner})
+            if obj.db_id == old.db_id] == ["iiiiiiiiiii"]
+    # The old video can be added again, the new one cannot.
+    Video.add_video("https://youtu.be/ggggggggggg", user_id=owner)
+    with pytest.raises(VideoAlreadyAddedException):
+        Video.add_video("https://youtu.be/iiiiiiiiiii", user_id=owner)
+    assert search_index.search("moving") == [("iiiiiiiiiii", "Moving")]
+
+
+def test_title_edit_updates_search_index(setup):
+    owner = create_user("retitle@test.com")
+    url = "https://youtu.be/ccccccccccc"
+    obj = Video.add_video(url, user_id=owner, title="Draft name")
+    obj.update_video_url(url, title="Final name")
+    assert search_index.search("draft") == []
+    assert search_index.search("final") == [("ccccccccccc", "Final name")]
+    assert lookup_video("ccccccccccc") is UNCACHED
+
+
+def test_get_object_or_404_refuses_several_rows(setup):
+    first, second = create_user("one@test.com"), create_user("two@test.com")
+    url = "https://youtu.be/ddddddddddd"
+    Video.add_video(url, user_id=first)
+    assert get_object_or_404(Video, host_id="ddddddddddd").user_id == first
+    Video.add_video(url, user_id=second)
+    for host_id, status_code in (("ddddddddddd", 400), ("eeeeeeeeeee", 404)):
+        with pytest.raises(HTTPException) as e:
+            get_object_or_404(Video, host_id=host_id)
+        assert e.value.status_code == status_code
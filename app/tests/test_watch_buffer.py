@@ -0,0 +1,84 @@
+import time
+import uuid
+
+import pytest
+
+from app.storage import set_storage
+from app.storage.memory import MemoryStorage
+from app.watch_events.buffer import WatchEventBuffer
+from app.watch_events.models import WatchEvent, WatchPosition
+
+
+class FlakyStorage(MemoryStorage):
+    """Fails the next `failures` requests."""
+    failures = 0
+
+    def execute_async(self, statement, execution_profile=None):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("write timed out")
+        return super().execute_async(statement, execution_profile=execution_profile)
+
+
+@pytest.fixture()
+def storage():
+    storage = set_storage(FlakyStorage())
+    yield storage
+    set_storage(None)
+
+
+def heartbeat(user_id, host_id, end_time):
+    return {"user_id": user_id, "host_id": host_id, "path": f"/videos/{host_id}",
+            "start_time": 0.0, "end_time": end_time, "duration": 100.0, "complete": False}
+
+
+def test_repeated_events_are_coalesced(storage):
+    buffer = WatchEventBuffer(flush_interval=60, flush_size=100)
+    user_id = uuid.uuid4()
+    for end_time in (1.0, 2.0, 3.0):
+        buffer.add(heartbeat(user_id, "a", end_time))
+    buffer.add(heartbeat(user_id, "b", 5.0))
+    assert buffer.depth == 2
+    assert buffer.flush() == 2
+    assert storage.get(WatchPosition, user_id=user_id, host_id="a").end_time == 3.0
+    stats = buffer.stats()
+    assert (stats["received"], stats["coalesced"], stats["written"]) == (4, 2, 2)
+
+
+def test_flush_size_wakes_the_flusher(storage):
+    buffer = WatchEventBuffer(flush_interval=60, flush_size=3)
+    buffer.start()
+    try:
+        user_id = uuid.uuid4()
+        for host_id in "abc":
+            buffer.add(heartbeat(user_id, host_id, 1.0))
+        deadline = time.monotonic() + 5
+        while buffer.stats()["written"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert buffer.stats()["written"] == 3
+    finally:
+        buffer.stop()
+
+
+def test_failed_flush_is_requeued(storage):
+    buffer = WatchEventBuffer(flush_interval=60, flush_size=100)
+    user_id = uuid.uuid4()
+    buffer.add(heartbeat(user_id, "a", 1.0))
+    buffer.add(heartbeat(user_id, "b", 1.0))
+    storage.failures = 1
+    assert buffer.flush() == 0
+    assert buffer.depth == 2 and buffer.stats()["failed"] == 2
+    # A newer heartbeat that arrived meanwhile wins over the requeued one.
+    buffer.add(heartbeat(user_id, "a", 9.0))
+    assert buffer.flush() == 2
+    assert storage.get(WatchPosition, user_id=user_id, host_id="a").end_time == 9.0
+
+
+def test_stop_drains_the_buffer(storage):
+    buffer = WatchEventBuffer(flush_interval=60, flush_size=100)
+    buffer.start()
+    event = buffer.add(heartbeat(uuid.uuid4(), "a", 4.0))
+    buffer.stop()
+    assert buffer.depth == 0
+    rows = storage.filter(WatchEvent, {"host_id": "a", "bucket": event["bucket"]})
+    assert [row.end_time for row in rows] == [4.0]
@@ -1,17 +1,31 @@
 import datetime
+import hashlib
+import time
 from jose import jwt, ExpiredSignatureError
 
 from app import config
+from app.cache import LRUCache
+from app.storage import get_storage
+from . import security
+from .exceptions import HashingUnavailableException
 from .models import User
 
 secret_key = config.get_settings().secret_key
 session_duration = config.get_settings().session_duration
 algo = config.get_settings().jwt_algo
 
+# Verified tokens keyed by digest, each kept until its `exp`. Tokens that
+# failed verification are remembered as False for a short while.
+token_cache = LRUCache(maxsize=config.get_settings().token_cache_size)
+token_negative_ttl = config.get_settings().token_negative_ttl
+UNVERIFIED = object()
+
 
 def create_user(email, password):
     try:
         user_obj = User.create_user(email, password)
+    except HashingUnavailableException:
+        raise
     except Exception as e:
         user_obj = None
     return user_obj
@@ -19,11 +33,15 @@ def create_user(email, password):
 
 def authenticate(email, password):
     try:
-        user_obj = User.objects.get(email=email)
+        user_obj = get_storage().get(User, email=email)
     except Exception as e:
         user_obj = None
-    if not user_obj.verify_password(password):
-        user_obj = None
+    if user_obj is None or not user_obj.verify_password(password):
+        return None
+    if security.needs_rehash(user_obj.password):
+        # Cost parameters changed since this hash was made; upgrade it
+        # while we still have the plain password.
+        user_obj.set_password(password, commit=True)
     return user_obj
 
 
@@ -35,7 +53,26 @@ def login(user_obj, expires=session_duration):
     return jwt.encode(raw_data, secret_key, algorithm=algo)
 
 
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def lookup_token(token):
+    """
+    Cached result of `verify_user_id` for `token`: the claims, None if
+    the token is known to be invalid, or UNVERIFIED if it was not seen.
+    """
+    if token is None:
+        return None
+    data = token_cache.get(token_digest(token), UNVERIFIED)
+    if data is False:
+        return None
+    return data
+
+
 def verify_user_id(token):
+    if token is None:
+        return None
     data = {}
     try:
         data = jwt.decode(token, secret_key, algorithms=[algo])
@@ -44,5 +81,9 @@ def verify_user_id(token):
     except:
         pass
     if 'user_id' not in data:
+        token_cache.set(token_digest(token), False, ttl=token_negative_ttl)
         return None
+    ttl = data.get("exp", time.time() + session_duration) - time.time()
+    if ttl > 0:
+        token_cache.set(token_digest(token), data, ttl=ttl)
     return data
@@ -4,6 +4,7 @@ from starlette.authentication import (
     UnauthenticatedUser,
     AuthCredentials
 )
+from starlette.concurrency import run_in_threadpool
 
 from . import auth
 
@@ -11,7 +12,9 @@ from . import auth
 class JWTCookieBackend(AuthenticationBackend):
     async def authenticate(self, request):
         session_id = request.cookies.get("session_id")
-        user_data = auth.verify_user_id(session_id)
+        user_data = auth.lookup_token(session_id)
+        if user_data is auth.UNVERIFIED:
+            user_data = await run_in_threadpool(auth.verify_user_id, session_id)
         if user_data is None:
             roles = ['anon']
             return AuthCredentials(roles), UnauthenticatedUser()
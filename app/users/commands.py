@@ -0,0 +1,59 @@
+import argparse
+
+from cassandra.concurrent import execute_concurrent_with_args
+from cassandra.cqlengine import connection
+
+from app import db
+from .models import User, UserById, UserEmail
+
+
+def backfill_user_lookups(fetch_size=1000, concurrency=50):
+    """Write the `UserById` and `UserEmail` rows of every existing `User`."""
+    session = connection.get_session()
+    by_id_stmt = db.prepare(
+        f"INSERT INTO {UserById.column_family_name()} (user_id, email) VALUES (?, ?)")
+    # Plain upserts, not IF NOT EXISTS: the user row already owns the email.
+    email_stmt = db.prepare(
+        f"INSERT INTO {UserEmail.column_family_name()} (email, user_id) VALUES (?, ?)")
+    q = User.objects.all().limit(None).fetch_size(fetch_size).values_list("user_id", "email")
+    pending = []
+    written = 0
+
+    def write(rows):
+        execute_concurrent_with_args(
+            session, by_id_stmt, rows, concurrency=concurrency, raise_on_first_error=True)
+        execute_concurrent_with_args(
+            session, email_stmt, [(email, user_id) for user_id, email in rows],
+            concurrency=concurrency, raise_on_first_error=True)
+
+    for user_id, email in q:
+        pending.append((user_id, email))
+        if len(pending) >= fetch_size:
+            write(pending)
+            written += len(pending)
+            pending = []
+    if pending:
+        write(pending)
+        written += len(pending)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.users.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser(
+        "backfill_user_lookups", help="Build the users_by_id and users_by_email tables")
+    backfill.add_argument("--fetch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    db.get_session()
+    try:
+        if args.command == "backfill_user_lookups":
+            written = backfill_user_lookups(fetch_size=args.fetch_size)
+            print(f"Backfilled {written} users")
+    finally:
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import inspect
 from functools import wraps
 from fastapi import Request, HTTPException
 
@@ -6,6 +7,15 @@ from .exceptions import LoginRequiredException
 
 
 def login_required(func):
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(request: Request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                raise LoginRequiredException(status_code=401)
+            return await func(request, *args, **kwargs)
+
+        return async_wrapper
+
     @wraps(func)
     def wrapper(request: Request, *args, **kwargs):
         if not request.user.is_authenticated:
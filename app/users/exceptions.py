@@ -7,3 +7,11 @@ class LoginRequiredException(HTTPException):
 
 class InvalidUserIdException(HTTPException):
     pass
+
+
+class HashingUnavailableException(HTTPException):
+    pass
+
+
+class InvalidEmailException(HTTPException):
+    pass
@@ -1,12 +1,26 @@
 import uuid
+from app.bloom import BloomFilter
+from app.cache import LRUCache
 from app.config import get_settings
+from app.storage import Delete, get_storage, insert
 from cassandra.cqlengine import columns
 from cassandra.cqlengine.models import Model
+from cassandra.cqlengine.query import LWTException
 
 from . import validators, security
+from .exceptions import InvalidEmailException
 
 settings = get_settings()
 
+# user_id -> email, filled from `UserById`.
+user_email_cache = LRUCache(maxsize=settings.user_cache_size,
+                            ttl=settings.user_cache_ttl)
+
+# Emails already taken. Filled by `load_email_filter` at startup and on
+# every signup in this process.
+email_filter = BloomFilter(capacity=settings.email_filter_capacity,
+                           error_rate=settings.email_filter_error_rate)
+
 
 class User(Model):
     __keyspace__ = settings.keyspace
@@ -24,7 +38,7 @@ class User(Model):
         pw_hash = security.generate_password_hash(pw)
         self.password = pw_hash
         if commit:
-            self.save()
+            get_storage().save(self)
         return True
 
     def verify_password(self, pw_str):
@@ -33,21 +47,84 @@ class User(Model):
 
     @staticmethod
     def create_user(email, password=None):
+        """
+        Claim `email` with a conditional insert, then write the user and
+        its id lookup. Raises InvalidEmailException for a malformed email
+        and LWTException if the email is taken.
+        """
+        valid, msg, _ = validators._validate_email(email)
+        if not valid:
+            raise InvalidEmailException(status_code=400, detail=msg)
+        storage = get_storage()
         obj = User(email=email)
-        obj.set_password(password, commit=True)
-        obj.save()
+        if not storage.save(UserEmail(email=email, user_id=obj.user_id), if_not_exists=True):
+            raise LWTException(None)
+        try:
+            obj.set_password(password)
+            storage.batch([insert(obj), insert(UserById(user_id=obj.user_id, email=obj.email))])
+        except Exception:
+            storage.execute(Delete(UserEmail, {"email": email}, conditions={"user_id": obj.user_id}))
+            raise
+        email_filter.add(email)
+        user_email_cache.set(obj.user_id, obj.email)
         return obj
 
+    @staticmethod
+    def email_taken(email):
+        """
+        Whether `email` belongs to a user. Only emails the filter has
+        seen cost a (single partition) read to rule out a false positive.
+        """
+        if email not in email_filter:
+            return False
+        return get_storage().get(User, email=email) is not None
+
+    @staticmethod
+    def email_for_user_id(user_id):
+        try:
+            user_id = uuid.UUID(str(user_id))
+        except ValueError:
+            return None
+        email = user_email_cache.get(user_id)
+        if email is None:
+            lookup = get_storage().get(UserById, user_id=user_id)
+            if lookup is None:
+                return None
+            email = user_email_cache.set(user_id, lookup.email)
+        return email
+
     @staticmethod
     def check_exists(user_id):
-        q = User.objects.filter(user_id=user_id).allow_filtering()
-        return q.count() != 0
+        return User.email_for_user_id(user_id) is not None
 
     @staticmethod
     def by_user_id(user_id=None):
         if user_id is None:
             return None
-        q = User.objects.filter(user_id=user_id).allow_filtering()
-        if q.count() != 1:
+        email = User.email_for_user_id(user_id)
+        if email is None:
             return None
-        return q.first()
+        return get_storage().get(User, email=email, user_id=user_id)
+
+
+class UserById(Model):
+    """Lookup of `User` by `user_id`, written in the same batch as the user."""
+    __keyspace__ = settings.keyspace
+    __table_name__ = "users_by_id"
+    user_id = columns.UUID(primary_key=True)
+    email = columns.Text()
+
+
+class UserEmail(Model):
+    """Claim of an email by a user, taken with INSERT ... IF NOT EXISTS."""
+    __keyspace__ = settings.keyspace
+    __table_name__ = "users_by_email"
+    email = columns.Text(primary_key=True)
+    user_id = columns.UUID()
+
+
+def load_email_filter(fetch_size=5000):
+    email_filter.clear()
+    for obj in get_storage().scan(User, columns=["email"], fetch_size=fetch_size):
+        email_filter.add(obj.email)
+    return email_filter.count
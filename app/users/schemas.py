@@ -31,8 +31,7 @@ class UserSignupSchema(BaseModel):
 
     @validator("email")
     def email_available(cls, v, values, **kwargs):
-        q = User.objects.filter(email=v)
-        if q.count() != 0:
+        if User.email_taken(v):
             raise ValueError("Email is not available")
         return v
 
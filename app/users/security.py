@@ -1,21 +1,84 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 
+from app.config import get_settings
+from .exceptions import HashingUnavailableException
 
-def generate_password_hash(pw_rw):
-    ph = PasswordHasher()
-    return ph.hash(pw_rw)
+settings = get_settings()
 
+password_hasher = PasswordHasher(
+    time_cost=settings.argon2_time_cost,
+    memory_cost=settings.argon2_memory_cost,
+    parallelism=settings.argon2_parallelism,
+)
 
-def verify_password(pw_hash, pw_rw):
-    ph = PasswordHasher()
+# Hashing runs in its own processes, but every hash in progress still
+# holds a request thread while it waits for the result. So by default
+# only one hash per worker process is admitted, and never more than a
+# quarter of Starlette's 40 threads; further requests are shed with a
+# 503 instead of tying up the threads video and heartbeat requests need.
+_workers = settings.password_hash_workers or os.cpu_count()
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(settings.password_hash_queue_size or min(_workers, 10))
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=_workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def shutdown_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise HashingUnavailableException(status_code=503)
+    try:
+        return get_executor().submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def _hash(pw_rw):
+    return password_hasher.hash(pw_rw)
+
+
+def _verify(pw_hash, pw_rw):
     verified = False
     msg = ""
     try:
-        verified = ph.verify(pw_hash, pw_rw)
+        verified = password_hasher.verify(pw_hash, pw_rw)
     except VerifyMismatchError as e:
         verified = False
         msg = "Invalid password."
     except Exception as e:
         msg = f"Unexcepted error: \n{e}"
     return verified, msg
+
+
+def generate_password_hash(pw_rw):
+    return _run(_hash, pw_rw)
+
+
+def verify_password(pw_hash, pw_rw):
+    return _run(_verify, pw_hash, pw_rw)
+
+
+def needs_rehash(pw_hash):
+    return password_hasher.check_needs_rehash(pw_hash)
@@ -1,11 +1,11 @@
 from email_validator import EmailNotValidError, validate_email
 
 
-def _validate_email(email):
+def _validate_email(email, check_deliverability=False):
     msg = ""
     valid = False
     try:
-        valid = validate_email(email)
+        valid = validate_email(email, check_deliverability=check_deliverability)
         email = valid.email
         valid = True
     except EmailNotValidError as e:
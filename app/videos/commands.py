@@ -0,0 +1,74 @@
+import argparse
+
+from cassandra.concurrent import execute_concurrent_with_args
+from cassandra.cqlengine import connection
+
+from app import db
+from .models import UserVideo, Video, VideoByUser
+
+
+def _write_rows(stmt, rows, fetch_size, concurrency):
+    """Execute `stmt` once per row, `fetch_size` rows at a time."""
+    session = connection.get_session()
+    pending = []
+    written = 0
+    for row in rows:
+        pending.append(row)
+        if len(pending) >= fetch_size:
+            execute_concurrent_with_args(
+                session, stmt, pending, concurrency=concurrency, raise_on_first_error=True)
+            written += len(pending)
+            pending = []
+    if pending:
+        execute_concurrent_with_args(
+            session, stmt, pending, concurrency=concurrency, raise_on_first_error=True)
+        written += len(pending)
+    return written
+
+
+def backfill_videos_by_user(fetch_size=1000, concurrency=50):
+    """Write the `VideoByUser` row of every existing `Video` with an owner."""
+    stmt = db.prepare(
+        f"INSERT INTO {VideoByUser.column_family_name()} "
+        "(user_id, db_id, host_id, title) VALUES (?, ?, ?, ?)")
+    q = Video.objects.all().limit(None).fetch_size(fetch_size).values_list(
+        "user_id", "db_id", "host_id", "title")
+    return _write_rows(stmt, (row for row in q if row[0] is not None), fetch_size, concurrency)
+
+
+def backfill_user_videos(fetch_size=1000, concurrency=50):
+    """
+    Write the `UserVideo` claim of every existing `Video` with an owner,
+    so videos added before the claims existed cannot be added again.
+    """
+    stmt = db.prepare(
+        f"INSERT INTO {UserVideo.column_family_name()} (user_id, host_id) VALUES (?, ?)")
+    q = Video.objects.all().limit(None).fetch_size(fetch_size).values_list("user_id", "host_id")
+    return _write_rows(stmt, (row for row in q if row[0] is not None), fetch_size, concurrency)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.videos.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser(
+        "backfill_videos_by_user", help="Build the videos_by_user table")
+    backfill.add_argument("--fetch-size", type=int, default=1000)
+    claims = subparsers.add_parser(
+        "backfill_user_videos", help="Claim every existing video for its owner")
+    claims.add_argument("--fetch-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    db.get_session()
+    try:
+        if args.command == "backfill_videos_by_user":
+            written = backfill_videos_by_user(fetch_size=args.fetch_size)
+            print(f"Backfilled {written} videos")
+        elif args.command == "backfill_user_videos":
+            written = backfill_user_videos(fetch_size=args.fetch_size)
+            print(f"Claimed {written} videos")
+    finally:
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
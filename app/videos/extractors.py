@@ -1,26 +1,60 @@
-from urllib.parse import parse_qs, urlparse
+import re
 
+# Matches the host and the rest of an http(s) URL; scheme and port are optional.
+URL_RE = re.compile(r"^\s*(?:https?:)?(?://)?(?P<host>[^/?#:\s]+)(?::\d+)?(?P<rest>[^#\s]*)", re.I)
 
-def extract_video_id(url):
-    # Source: https://stackoverflow.com/a/54383711
-    # Examples:
-    # - http://youtu.be/nNpvWBuTfrc
-    # - http://www.youtube.com/watch?v=nNpvWBuTfrc&feature=feedu
-    # - http://www.youtube.com/embed/nNpvWBuTfrc
-    # - http://www.youtube.com/v/nNpvWBuTfrc?version=3&amp;hl=en_US
-    query = urlparse(url)
-    if query.hostname == "youtu.be":
-        return query.path[1:]
-    if query.hostname in {"www.youtube.com", "youtube.com"}:
-        if query.path == "/watch":
-            return parse_qs(query.query)["v"][0]
-        if query.path[:7] == "/watch/":
-            return query.path.split("/")[1]
-        if query.path[:7] == "/embed/":
-            return query.path.split("/")[2]
-        if query.path[:3] == "/v/":
-            return query.path.split("/")[2]
-        # # below is optional for playlists
-        # if query.path[:9] == "/playlist":
-        #     return parse_qs(query.query)["list"][0]
+# host -> [(host_service, compiled pattern)], see `register`.
+registry = {}
+
+
+def register(host_service, hosts, *patterns):
+    """
+    Route URLs of `hosts` to `host_service`. Each pattern is matched
+    against the path and query of the URL and must capture the video id
+    as `id`; the first one that matches wins.
+    """
+    compiled = [(host_service, re.compile(pattern)) for pattern in patterns]
+    for host in hosts:
+        registry.setdefault(host.lower(), []).extend(compiled)
+
+
+YOUTUBE_ID = r"(?P<id>[\w-]{11})(?![\w-])"
+register(
+    "youtube",
+    ["youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com",
+     "youtube-nocookie.com", "www.youtube-nocookie.com"],
+    rf"^/watch/?\?(?:[^#]*&)?v={YOUTUBE_ID}",
+    rf"^/(?:watch|embed|v|shorts|live|e)/{YOUTUBE_ID}",
+)
+register("youtube", ["youtu.be", "www.youtu.be"], rf"^/{YOUTUBE_ID}")
+register(
+    "vimeo",
+    ["vimeo.com", "www.vimeo.com", "player.vimeo.com"],
+    r"^/(?:video/|channels/[\w-]+/|groups/[\w-]+/videos/)?(?P<id>\d+)(?![\w-])",
+)
+register(
+    "dailymotion",
+    ["dailymotion.com", "www.dailymotion.com"],
+    r"^/(?:embed/)?video/(?P<id>x[0-9a-z]+)",
+)
+register("dailymotion", ["dai.ly"], r"^/(?P<id>x[0-9a-z]+)")
+
+
+def extract(url):
+    """Return `(host_service, host_id)` for a supported video URL, else None."""
+    if not url:
+        return None
+    match = URL_RE.match(url)
+    if match is None:
+        return None
+    rest = match.group("rest")
+    for host_service, pattern in registry.get(match.group("host").lower(), ()):
+        found = pattern.match(rest)
+        if found is not None:
+            return host_service, found.group("id")
     return None
+
+
+def extract_video_id(url):
+    found = extract(url)
+    return found[1] if found is not None else None
@@ -0,0 +1,122 @@
+import asyncio
+import codecs
+import csv
+
+from starlette.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from .exceptions import InvalidYoutubeVideoURLException, VideoAlreadyAddedException
+from .extractors import extract
+from .models import Video
+
+settings = get_settings()
+
+
+async def iter_lines(upload, chunk_size=64 * 1024):
+    """Decode an UploadFile chunk by chunk and yield its lines."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    while True:
+        chunk = await upload.read(chunk_size)
+        buffer += decoder.decode(chunk, final=not chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+        if not chunk:
+            break
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def parse_rows(lines):
+    """
+    Turn uploaded lines into `(line_number, url, title)`.
+
+    Plain lists have one URL per line. CSV input may start with a header
+    naming `url` and `title` columns; without one the URL is the first
+    cell and the title the second.
+    """
+    url_index, title_index = 0, 1
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        cells = [cell.strip() for cell in next(csv.reader([line]), [])]
+        if number == 1 and "url" in (name.lower() for name in cells):
+            names = [name.lower() for name in cells]
+            url_index = names.index("url")
+            title_index = names.index("title") if "title" in names else None
+            continue
+        url = cells[url_index] if len(cells) > url_index else ""
+        title = cells[title_index] if title_index is not None and len(cells) > title_index else ""
+        yield number, url, title or None
+
+
+def _add_video(url, user_id, host_service, host_id, title):
+    try:
+        _, created = Video.get_or_create_video(
+            url, user_id, host_id=host_id, host_service=host_service, title=title)
+    except InvalidYoutubeVideoURLException:
+        return "invalid"
+    except VideoAlreadyAddedException:
+        return "already_added"
+    return "created" if created else "exists"
+
+
+async def import_videos(rows, user_id, concurrency=None, max_rows=None):
+    """
+    Add the videos of `rows` for `user_id`, at most `concurrency` at a
+    time, and yield one result per row as it finishes.
+
+    Rows whose URL is not a supported video, or repeats a video id seen earlier
+    in the upload, are reported without touching the database. Reading
+    stops at `max_rows`, with one "truncated" result for the first row
+    left out.
+    """
+    concurrency = concurrency or settings.bulk_import_concurrency
+    max_rows = max_rows or settings.bulk_import_max_rows
+    pending = set()
+    seen = {}
+    count = 0
+
+    async def add(number, url, host_service, host_id, title):
+        result = {"line": number, "url": url, "host_id": host_id}
+        try:
+            result["status"] = await run_in_threadpool(
+                _add_video, url, user_id, host_service, host_id, title)
+        except Exception:
+            result["status"] = "error"
+        return result
+
+    try:
+        async for number, url, title in rows:
+            count += 1
+            if count > max_rows:
+                yield {"line": number, "status": "truncated",
+                       "detail": f"Imports are limited to {max_rows} rows; "
+                                 f"this line and the ones after it were not read"}
+                break
+            found = extract(url)
+            if found is None:
+                yield {"line": number, "url": url, "status": "invalid"}
+                continue
+            host_service, host_id = found
+            if host_id in seen:
+                yield {"line": number, "url": url, "host_id": host_id,
+                       "status": "duplicate", "detail": f"Same video as line {seen[host_id]}"}
+                continue
+            seen[host_id] = number
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.ensure_future(add(number, url, host_service, host_id, title)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # The client went away mid-report; don't start more writes.
+        for task in pending:
+            task.cancel()
@@ -1,18 +1,26 @@
 import uuid
+from app import db
+from app.cache import LRUCache
 from app.config import get_settings
+from app.storage import Delete, Insert, Select, get_storage, insert
 from cassandra.cqlengine import columns
 from cassandra.cqlengine.models import Model
-from cassandra.cqlengine.query import DoesNotExist, MultipleObjectsReturned
 
 from app.users.exceptions import InvalidUserIdException
-from app.users.models import User
-from app.shortcuts import templates
+from app.users.models import UserById, user_email_cache
+from app.shortcuts import render_fragment
 from .exceptions import InvalidYoutubeVideoURLException, VideoAlreadyAddedException
-from .extractors import extract_video_id
+from .extractors import extract
+from .search import search_index
 
 
 settings = get_settings()
 
+# Video rows keyed by host_id. host_ids known not to exist are kept as
+# False for `video_cache_negative_ttl` seconds.
+video_cache = LRUCache(maxsize=settings.video_cache_size, ttl=settings.video_cache_ttl)
+UNCACHED = object()
+
 
 class Video(Model):
     __keyspace__ = settings.keyspace
@@ -36,50 +44,275 @@ class Video(Model):
         basename = self.host_service
         template_name = f"videos/renderers/{basename}.html"
         context = {"host_id": self.host_id, "title": self.title}
-        t = templates.get_template(template_name)
-        return t.render(context)
+        return render_fragment(template_name, context)
 
-    def update_video_url(self, url, save=True):
-        host_id = extract_video_id(url)
-        if not host_id:
+    def update_video_url(self, url, save=True, title=None):
+        """
+        Point the video at `url` and, if given, a new `title`. When the URL
+        names another video the row moves to the new host_id partition,
+        together with the owner's (user_id, host_id) claim; a claim that
+        is already taken raises VideoAlreadyAddedException and changes
+        nothing.
+        """
+        found = extract(url)
+        if found is None:
             return None
+        old_host_id = self.host_id
+        moved = found[1] != old_host_id
+        claimed = False
+        if save and moved and self.user_id is not None:
+            claimed = UserVideo.claim_async(self.user_id, found[1]).result()
+            if not claimed:
+                raise VideoAlreadyAddedException("Video already added")
         self.url = url
-        self.host_id = host_id
+        self.title = title or self.title
+        self.host_service, self.host_id = found
         if save:
-            self.save()
+            statements = [insert(self)]
+            if moved:
+                statements.append(Delete(Video, {"host_id": old_host_id, "db_id": self.db_id}))
+            if self.user_id is not None:
+                statements.append(insert(VideoByUser(user_id=self.user_id, db_id=self.db_id,
+                                                     host_id=self.host_id, title=self.title)))
+            try:
+                get_storage().batch(statements)
+            except Exception:
+                if claimed:
+                    UserVideo.release(self.user_id, self.host_id)
+                raise
+            if claimed:
+                UserVideo.release(self.user_id, old_host_id)
+            invalidate_video(self.host_id)
+            search_index.add(self.host_id, self.title)
+            if moved:
+                refresh_host(old_host_id)
         return url
 
+    def delete_video(self):
+        storage = get_storage()
+        storage.delete(Video, host_id=self.host_id, db_id=self.db_id)
+        if self.user_id is not None:
+            storage.delete(VideoByUser, user_id=self.user_id, db_id=self.db_id)
+            UserVideo.release(self.user_id, self.host_id)
+        refresh_host(self.host_id)
+
     @property
     def path(self):
         return f"/videos/{self.host_id}"
 
     @staticmethod
-    def get_or_create_video(url, user_id=None, **kwargs):
-        host_id = extract_video_id(url)
-        obj = None
-        created = False
-        try:
-            obj = Video.objects.get(host_id=host_id)
-        except MultipleObjectsReturned:
-            q = Video.objects.allow_filtering().filter(host_id=host_id)
-            obj = q.first()
-        except DoesNotExist:
-            obj = Video.add_video(url, user_id, **kwargs)
-            created = True
-        except:
-            raise Exception("Invalid Exception")
-        return obj, created
+    def get_or_create_video(url, user_id=None, host_id=None, host_service=None, **kwargs):
+        """
+        Return the video for `url`, adding it for `user_id` if nobody has.
+
+        On a cold cache the existing-video read, the (user_id, host_id)
+        claim and the user check go out together; a new video costs one
+        more write. The claim only stands when the video gets added: if
+        the read finds it, a claim taken here is released again. A claim
+        that is already taken while the video does not exist yet means
+        the same user is adding it concurrently.
+        """
+        host_service, host_id = _resolve(url, host_service, host_id)
+        user_id = _as_user_id(user_id)
+        # Only a cached row saves the read: a stale negative entry here
+        # would add a second row for the same host_id.
+        cached = lookup_video(host_id)
+        existing = claim = None
+        if not isinstance(cached, Video):
+            existing = get_storage().execute_async(
+                Select(Video, {"host_id": host_id}, limit=1),
+                execution_profile=db.EXEC_PROFILE_POINT_READ)
+            claim = UserVideo.claim_async(user_id, host_id)
+        user_check = _check_user_async(user_id)
+        rows = existing.result() if existing is not None else None
+        claimed = claim.result() if claim is not None else False
+        if not _user_exists(user_id, user_check):
+            if claimed:
+                UserVideo.release(user_id, host_id)
+            raise InvalidUserIdException(status_code=400, detail="Invalid user_id")
+        if existing is None:
+            return cached, False
+        if rows:
+            if claimed:
+                UserVideo.release(user_id, host_id)
+            return cache_video(host_id, Video._construct_instance(rows[0])), False
+        if not claimed:
+            raise VideoAlreadyAddedException("Video already added")
+        return Video._insert(host_id, user_id, url, host_service=host_service, **kwargs), True
 
     @staticmethod
-    def add_video(url, user_id=None, title=None):
-        host_id = extract_video_id(url)
-        if not host_id:
-            raise InvalidYoutubeVideoURLException("Invalid Youtube Video URL")
-        user = User.check_exists(user_id)
-        if not user:
-            raise InvalidUserIdException("Invalid user_id")
-        q = Video.objects.filter(
-            host_id=host_id, user_id=user_id).allow_filtering()
-        if q.count() != 0:
+    def add_video(url, user_id=None, title=None, host_id=None, host_service=None):
+        host_service, host_id = _resolve(url, host_service, host_id)
+        user_id = _as_user_id(user_id)
+        claim = UserVideo.claim_async(user_id, host_id)
+        user_check = _check_user_async(user_id)
+        claimed = claim.result()
+        if not _user_exists(user_id, user_check):
+            if claimed:
+                UserVideo.release(user_id, host_id)
+            raise InvalidUserIdException(status_code=400, detail="Invalid user_id")
+        if not claimed:
             raise VideoAlreadyAddedException("Video already added")
-        return Video.create(host_id=host_id, user_id=user_id, url=url, title=title)
+        return Video._insert(host_id, user_id, url, title=title, host_service=host_service)
+
+    @staticmethod
+    def _insert(host_id, user_id, url, title=None, host_service="youtube"):
+        """Write a new video for the holder of its (user_id, host_id) claim."""
+        obj = Video(host_id=host_id, user_id=user_id, url=url, title=title,
+                    host_service=host_service)
+        try:
+            get_storage().batch([
+                insert(obj),
+                insert(VideoByUser(user_id=obj.user_id, db_id=obj.db_id, host_id=obj.host_id, title=obj.title)),
+            ])
+        except Exception:
+            # Without the video the claim would block the user for good.
+            UserVideo.release(user_id, host_id)
+            raise
+        search_index.add(host_id, title)
+        return cache_video(host_id, obj)
+
+    @staticmethod
+    def get_many(host_ids, concurrency=None):
+        """
+        Look up several videos at once. Returns `{host_id: (video, error)}`
+        for every distinct host id: `video` is None when there is no such
+        video, and `error` is the exception of a read that failed. Cache
+        misses are read concurrently, at most `concurrency` at a time.
+        """
+        found = {}
+        pending = []
+        for host_id in dict.fromkeys(host_ids):
+            obj = lookup_video(host_id)
+            if obj is UNCACHED:
+                pending.append(host_id)
+            else:
+                found[host_id] = (obj, None)
+        results = get_storage().execute_concurrent(
+            [Select(Video, {"host_id": host_id}, limit=1) for host_id in pending],
+            concurrency=concurrency or settings.video_fetch_concurrency,
+            execution_profile=db.EXEC_PROFILE_POINT_READ)
+        for host_id, (success, result) in zip(pending, results):
+            if not success:
+                found[host_id] = (None, result)
+                continue
+            obj = Video._construct_instance(result[0]) if result else None
+            found[host_id] = (cache_video(host_id, obj), None)
+        return found
+
+
+def load_search_index(fetch_size=5000):
+    """Stream the host id and title of every video into `search_index`."""
+    search_index.clear()
+    rows = get_storage().scan(Video, columns=["host_id", "title"], fetch_size=fetch_size)
+    return search_index.load((obj.host_id, obj.title) for obj in rows)
+
+
+def _resolve(url, host_service=None, host_id=None):
+    """`(host_service, host_id)` as given by the caller, or extracted from `url`."""
+    if host_id:
+        return host_service or "youtube", host_id
+    found = extract(url)
+    if found is None:
+        raise InvalidYoutubeVideoURLException("Invalid video URL")
+    return found
+
+
+def lookup_video(host_id):
+    """
+    The cached `Video` of `host_id`, None if it is known not to exist,
+    or UNCACHED. Every hit is a fresh instance, so callers may modify it.
+    """
+    row = video_cache.get(host_id, UNCACHED)
+    if row is UNCACHED:
+        return UNCACHED
+    if row is False:
+        return None
+    return Video._construct_instance(dict(row))
+
+
+def cache_video(host_id, obj):
+    if obj is None:
+        video_cache.set(host_id, False, ttl=settings.video_cache_negative_ttl)
+    else:
+        video_cache.set(host_id, {name: getattr(obj, name) for name in Video._columns})
+    return obj
+
+
+def invalidate_video(*host_ids):
+    for host_id in host_ids:
+        video_cache.pop(host_id)
+
+
+def refresh_host(host_id):
+    """
+    After a row of `host_id` went away: other users may have added the
+    same video, and their row takes over the cache and search entries.
+    Without one both are dropped.
+    """
+    remaining = get_storage().get(Video, host_id=host_id)
+    if remaining is None:
+        invalidate_video(host_id)
+        search_index.remove(host_id)
+    else:
+        cache_video(host_id, remaining)
+        search_index.add(host_id, remaining.title)
+
+
+class VideoByUser(Model):
+    """A user's videos, newest first, for the dashboard library."""
+    __keyspace__ = settings.keyspace
+    __table_name__ = "videos_by_user"
+    user_id = columns.UUID(primary_key=True)
+    db_id = columns.TimeUUID(primary_key=True, clustering_order="DESC")
+    host_id = columns.Text()
+    title = columns.Text()
+
+    @property
+    def path(self):
+        return f"/videos/{self.host_id}"
+
+
+class UserVideo(Model):
+    """
+    Which user added which video. Claimed with INSERT ... IF NOT EXISTS
+    so the same user cannot add a video twice, even concurrently.
+    """
+    __keyspace__ = settings.keyspace
+    user_id = columns.UUID(primary_key=True)
+    host_id = columns.Text(primary_key=True)
+
+    @staticmethod
+    def claim_async(user_id, host_id):
+        return get_storage().execute_async(
+            Insert(UserVideo, {"user_id": user_id, "host_id": host_id}, if_not_exists=True))
+
+    @staticmethod
+    def release(user_id, host_id):
+        get_storage().execute(
+            Delete(UserVideo, {"user_id": user_id, "host_id": host_id}, if_exists=True))
+
+
+def _as_user_id(user_id):
+    try:
+        return uuid.UUID(str(user_id))
+    except ValueError:
+        raise InvalidUserIdException(status_code=400, detail="Invalid user_id")
+
+
+def _check_user_async(user_id):
+    """Start a users_by_id read unless the user is already cached."""
+    if user_email_cache.get(user_id) is not None:
+        return None
+    return get_storage().execute_async(
+        Select(UserById, {"user_id": user_id}, columns=["email"]))
+
+
+def _user_exists(user_id, user_check):
+    if user_check is None:
+        return True
+    rows = user_check.result()
+    if not rows:
+        return False
+    user_email_cache.set(user_id, rows[0]["email"])
+    return True
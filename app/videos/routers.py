@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends, Form, Request
-from fastapi.responses import HTMLResponse
+import json
+import uuid
+from collections import Counter
+from typing import Optional
+from fastapi import APIRouter, Depends, File, Form, Request, UploadFile
+from fastapi.responses import HTMLResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
 
-from app import utils
-from app.shortcuts import get_object_or_404, redirect, render, is_htmx
+from app import repository, utils
+from app.pagination import paginate
+from app.shortcuts import get_object_or_404, object_or_404, redirect, render, is_htmx
+from app.storage import get_storage
 from app.users.decorators import login_required
-from app.watch_events.models import WatchEvent
+from .exceptions import VideoAlreadyAddedException
+from .imports import import_videos, iter_lines, parse_rows
 from .models import Video
+from .search import search_index
 from .schemas import VideoCreateSchema, VideoEditSchema
 
 router = APIRouter(
@@ -15,7 +25,7 @@ router = APIRouter(
 
 @router.get("/create", response_class=HTMLResponse)
 @login_required
-def video_create_view(request: Request, is_htmx=Depends(is_htmx)):
+async def video_create_view(request: Request, is_htmx=Depends(is_htmx)):
     if is_htmx:
         return render(request, "videos/htmx/create.html", {})
     return render(request, "videos/create.html", {})
@@ -48,19 +58,75 @@ def video_create_post_view(request: Request, url: str = Form(...), title: str =
     return redirect(redirect_path)
 
 
+@router.post("/import")
+@login_required
+async def video_import_view(
+    request: Request,
+    file: UploadFile = File(...),
+    playlist_id: Optional[uuid.UUID] = Form(default=None),
+):
+    """
+    Add every video of an uploaded URL list or CSV and stream back one
+    JSON line per row, then a summary line. With `playlist_id` the added
+    videos are appended to that playlist, in file order, in one batch.
+    """
+    playlist_obj = None
+    if playlist_id is not None:
+        playlist_obj = object_or_404(await repository.get_playlist(playlist_id))
+        if str(playlist_obj.user_id) != request.user.username:
+            raise HTTPException(status_code=403)
+
+    async def report():
+        counts = Counter()
+        added = []
+        rows = parse_rows(iter_lines(file))
+        async for result in import_videos(rows, request.user.username):
+            counts[result["status"]] += 1
+            if result["status"] in ("created", "exists"):
+                added.append((result["line"], result["host_id"]))
+            yield json.dumps(result) + "\n"
+        summary = {"summary": dict(counts)}
+        if playlist_obj is not None and added:
+            host_ids = [host_id for _, host_id in sorted(added)]
+            await run_in_threadpool(playlist_obj.append_videos, host_ids)
+            summary.update({"playlist_id": str(playlist_obj.db_id), "playlist_added": len(host_ids)})
+        yield json.dumps(summary) + "\n"
+
+    return StreamingResponse(report(), media_type="application/x-ndjson")
+
+
 @router.get("/", response_class=HTMLResponse)
-def video_list_view(request: Request):
-    q = Video.objects.all().limit(100)
+async def video_list_view(request: Request, cursor: Optional[str] = None, is_htmx=Depends(is_htmx)):
+    object_list, next_cursor = await paginate(
+        Video, "videos", cursor=cursor, cache=not request.user.is_authenticated)
     context = {
-        "object_list": q
+        "object_list": object_list,
+        "next_cursor": next_cursor,
     }
+    if is_htmx:
+        return render(request, "videos/htmx/list-items.html", context)
     return render(request, "videos/list.html", context)
 
 
+@router.get("/search", response_class=HTMLResponse)
+async def video_search_view(request: Request, q: str = "", is_htmx=Depends(is_htmx)):
+    object_list = [
+        {"host_id": host_id, "title": title, "path": f"/videos/{host_id}"}
+        for host_id, title in search_index.search(q)
+    ]
+    context = {
+        "q": q,
+        "object_list": object_list,
+    }
+    if is_htmx:
+        return render(request, "videos/htmx/search-results.html", context)
+    return render(request, "videos/search.html", context)
+
+
 @router.get("/{host_id}", response_class=HTMLResponse)
-def video_detail_view(request: Request, host_id: str):
-    video_obj = get_object_or_404(Video, host_id=host_id)
-    start_time = WatchEvent.get_resume_time(
+async def video_detail_view(request: Request, host_id: str):
+    video_obj = object_or_404(await repository.get_video(host_id))
+    start_time = await repository.get_resume_time(
         host_id, request.user.username) if request.user.is_authenticated else 0
     context = {
         "host_id": host_id,
@@ -72,8 +138,8 @@ def video_detail_view(request: Request, host_id: str):
 
 @router.get("/{host_id}/edit", response_class=HTMLResponse)
 @login_required
-def video_edit_view(request: Request, host_id: str):
-    video_obj = get_object_or_404(Video, host_id=host_id)
+async def video_edit_view(request: Request, host_id: str):
+    video_obj = object_or_404(await repository.get_video(host_id))
     context = {
         "host_id": host_id,
         "object": video_obj,
@@ -97,7 +163,34 @@ def video_edit_post_view(request: Request, host_id: str, url: str = Form(...), t
         raw_data, VideoEditSchema)
     if len(errors) > 0:
         return render(request, "videos/edit.html", context, status_code=400)
-    video_obj.title = data.get("title") or video_obj.title
     # video_obj.url = data.get("url") or video_obj.url
-    video_obj.update_video_url(url, save=True)
+    try:
+        video_obj.update_video_url(url, save=True, title=data.get("title"))
+    except VideoAlreadyAddedException:
+        context["errors"] = [{"loc": ["url"], "msg": f"{url} has already been added to your account."}]
+        return render(request, "videos/edit.html", context, status_code=400)
     return render(request, "videos/edit.html", context, status_code=200)
+
+
+def _owned_video_or_403(rows, request):
+    """The requester's row among the `Video` rows of one host_id."""
+    object_or_404(rows or None)
+    for obj in rows:
+        if str(obj.user_id) == request.user.username:
+            return obj
+    raise HTTPException(status_code=403)
+
+
+@router.get("/{host_id}/delete", response_class=HTMLResponse)
+@login_required
+async def video_delete_view(request: Request, host_id: str):
+    video_obj = _owned_video_or_403(await repository.get_video_rows(host_id), request)
+    return render(request, "videos/delete.html", {"object": video_obj})
+
+
+@router.post("/{host_id}/delete", response_class=HTMLResponse)
+@login_required
+def video_delete_post_view(request: Request, host_id: str):
+    video_obj = _owned_video_or_403(get_storage().filter(Video, {"host_id": host_id}), request)
+    video_obj.delete_video()
+    return redirect("/")
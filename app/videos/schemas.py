@@ -3,7 +3,7 @@ from pydantic import BaseModel, validator, root_validator
 
 from app.users.exceptions import InvalidUserIdException
 from .exceptions import InvalidYoutubeVideoURLException, VideoAlreadyAddedException
-from .extractors import extract_video_id
+from .extractors import extract
 from .models import Video
 
 
@@ -12,28 +12,24 @@ class VideoCreateSchema(BaseModel):
     user_id: uuid.UUID
     title: str
 
-    @validator("url")
-    def validate_video_url(cls, v, values, **kwargs):
-        url = v
-        video_id = extract_video_id(url)
-        if video_id is None:
-            raise ValueError(f"{url} is not a valid youtube url")
-        return url
-
     @root_validator
     def validate_data(cls, values):
         url = values.get("url")
         if url is None:
             raise ValueError(
                 "A valid url is required.")
+        found = extract(url)
+        if found is None:
+            raise ValueError(f"{url} is not a supported video url")
+        host_service, host_id = found
         user_id = values.get("user_id")
         title = values.get("title") if values.get("title") != "" else None
         try:
             video_obj, created = Video.get_or_create_video(
-                url, user_id, title=title)
+                url, user_id, host_id=host_id, host_service=host_service, title=title)
         except InvalidYoutubeVideoURLException:
             raise ValueError(
-                f"{url} is not a valid youtube url")
+                f"{url} is not a supported video url")
         except VideoAlreadyAddedException:
             raise ValueError(
                 f"{url} has already been added to your account.")
@@ -59,7 +55,6 @@ class VideoEditSchema(BaseModel):
     @validator("url")
     def validate_video_url(cls, v, values, **kwargs):
         url = v
-        video_id = extract_video_id(url)
-        if video_id is None:
-            raise ValueError(f"{url} is not a valid youtube url")
+        if extract(url) is None:
+            raise ValueError(f"{url} is not a supported video url")
         return url
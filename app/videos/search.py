@@ -0,0 +1,154 @@
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+
+from app.config import get_settings
+
+settings = get_settings()
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercased words of `text` with accents stripped."""
+    if not text:
+        return []
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return TOKEN_RE.findall(text.lower())
+
+
+def document_tokens(host_id, title_tokens):
+    """Tokens a video is found by: its title words and its host id, whole and split."""
+    return set(title_tokens) | set(tokenize(host_id)) | {host_id.lower()}
+
+
+class VideoSearchIndex:
+    """
+    In-process inverted index over video titles and host ids.
+
+    Every token maps to the host ids whose title contains it. A sorted
+    copy of the vocabulary, rebuilt lazily after new tokens show up, is
+    bisected for prefix lookups. Each worker keeps its own index, so
+    videos added through another worker show up after its next restart.
+    """
+
+    # Shorter words are matched whole only; a one-letter prefix would
+    # touch a large part of the vocabulary on every first keystroke.
+    min_prefix = 2
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._titles = {}
+        self._leading = {}
+        self._postings = {}
+        self._vocabulary = []
+        self._vocabulary_dirty = False
+
+    def __len__(self):
+        return len(self._titles)
+
+    def add(self, host_id, title=None):
+        with self._lock:
+            if host_id in self._titles:
+                self._remove(host_id)
+            tokens = tokenize(title)
+            self._titles[host_id] = title
+            self._leading[host_id] = tokens[0] if tokens else host_id.lower()
+            for token in document_tokens(host_id, tokens):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = set()
+                    self._vocabulary_dirty = True
+                postings.add(host_id)
+
+    def remove(self, host_id):
+        with self._lock:
+            if host_id in self._titles:
+                self._remove(host_id)
+
+    def _remove(self, host_id):
+        title = self._titles.pop(host_id)
+        del self._leading[host_id]
+        for token in document_tokens(host_id, tokenize(title)):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.discard(host_id)
+            if not postings:
+                del self._postings[token]
+                self._vocabulary_dirty = True
+
+    def load(self, rows):
+        """Add `(host_id, title)` rows; returns how many were read."""
+        count = 0
+        for host_id, title in rows:
+            self.add(host_id, title)
+            count += 1
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._titles.clear()
+            self._leading.clear()
+            self._postings.clear()
+            self._vocabulary = []
+            self._vocabulary_dirty = False
+
+    def _expand(self, prefix):
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff", start)
+        return self._vocabulary[start:end]
+
+    def search(self, query, limit=None):
+        """
+        Return up to `limit` `(host_id, title)` pairs matching every word
+        of `query`, best first. Any word of `min_prefix` letters or more
+        may be a prefix. A whole-word match scores 2 and a prefix match 1;
+        titles that start with the first query word, then shorter titles,
+        rank higher.
+        """
+        limit = limit or settings.search_results_limit
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = dict.fromkeys(self._postings.get(term, ()), 2)
+                if len(term) >= self.min_prefix:
+                    for token in self._expand(term):
+                        if token != term:
+                            for host_id in self._postings[token]:
+                                term_scores.setdefault(host_id, 1)
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {host_id: score + term_scores[host_id]
+                              for host_id, score in scores.items() if host_id in term_scores}
+                if not scores:
+                    return []
+            titles, leading, first = self._titles, self._leading, terms[0]
+
+            def rank(host_id):
+                title = titles[host_id] or host_id
+                return (-scores[host_id], leading[host_id] != first, len(title), title)
+
+            best = heapq.nsmallest(limit, scores, key=rank)
+            return [(host_id, titles[host_id]) for host_id in best]
+
+    def stats(self):
+        return {
+            "videos": len(self._titles),
+            "tokens": len(self._postings),
+            "postings": sum(len(postings) for postings in self._postings.values()),
+        }
+
+
+search_index = VideoSearchIndex()
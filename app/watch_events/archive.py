@@ -0,0 +1,136 @@
+import datetime
+import os
+import uuid
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from app.config import get_settings
+from app.videos.models import Video
+from .models import WatchEvent, day_buckets
+
+settings = get_settings()
+
+ARCHIVE_FIELDS = ("event_id", "user_id", "path",
+                  "start_time", "end_time", "duration", "complete")
+# Written into a day's directory once all of its buckets are archived.
+DONE_MARKER = ".done"
+
+
+def archive_path(host_id, bucket, directory=None):
+    directory = directory or settings.archive_dir
+    return os.path.join(str(directory), bucket.isoformat(), f"{quote(host_id, safe='')}.npz")
+
+
+def day_done_path(bucket, directory=None):
+    directory = directory or settings.archive_dir
+    return os.path.join(str(directory), bucket.isoformat(), DONE_MARKER)
+
+
+def archive_bucket(host_id, bucket, directory=None, fetch_size=5000):
+    """
+    Stream one (host_id, day) partition into a compressed columnar file.
+
+    Each column is stored as its own array of an `.npz` archive; UUIDs
+    are kept as raw 16 byte rows. Columns are filled page by page as the
+    rows arrive. Returns the number of archived events; an empty
+    partition writes nothing and returns 0.
+    """
+    q = WatchEvent.objects.filter(host_id=host_id, bucket=bucket)
+    event_ids, user_ids = bytearray(), bytearray()
+    paths, start_times, end_times, durations, completes = [], [], [], [], []
+    for event_id, user_id, path, start_time, end_time, duration, complete in (
+            q.limit(None).fetch_size(fetch_size).values_list(*ARCHIVE_FIELDS)):
+        event_ids += event_id.bytes
+        user_ids += user_id.bytes
+        paths.append(path or "")
+        start_times.append(start_time)
+        end_times.append(end_time)
+        durations.append(duration)
+        completes.append(complete)
+    if not paths:
+        return 0
+    path = archive_path(host_id, bucket, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            event_id=np.frombuffer(bytes(event_ids), dtype=np.uint8).reshape(-1, 16),
+            user_id=np.frombuffer(bytes(user_ids), dtype=np.uint8).reshape(-1, 16),
+            path=np.array(paths, dtype=str),
+            start_time=np.array(start_times, dtype=np.float64),
+            end_time=np.array(end_times, dtype=np.float64),
+            duration=np.array(durations, dtype=np.float64),
+            complete=np.array(completes, dtype=bool),
+        )
+    os.replace(tmp_path, path)
+    return len(paths)
+
+
+def archive_buckets(today=None, directory=None):
+    """
+    Archive every closed day bucket that is still in the table and not
+    yet on disk, i.e. days older than `watch_event_archive_after_days`
+    that have not passed `watch_event_ttl_days`.
+
+    A day whose videos have all been archived, or found empty, gets a
+    `DONE_MARKER` file and is not looked at again, so each run only
+    queries the days that closed since the last one.
+    """
+    today = today or datetime.datetime.utcnow().date()
+    end = today - datetime.timedelta(days=settings.watch_event_archive_after_days)
+    start = today - datetime.timedelta(days=max(settings.watch_event_ttl_days - 1, 0))
+    archived = 0
+    for bucket in day_buckets(start, end):
+        done_path = day_done_path(bucket, directory)
+        if os.path.exists(done_path):
+            continue
+        last_host_id = None
+        for host_id in Video.objects.all().limit(None).values_list("host_id", flat=True):
+            if host_id == last_host_id:
+                continue
+            last_host_id = host_id
+            if os.path.exists(archive_path(host_id, bucket, directory)):
+                continue
+            if archive_bucket(host_id, bucket, directory):
+                archived += 1
+        os.makedirs(os.path.dirname(done_path), exist_ok=True)
+        open(done_path, "w").close()
+    return archived
+
+
+def load_archive(path):
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def scan_archives(host_id=None, start=None, end=None, directory=None):
+    """
+    Yield `(host_id, bucket, columns)` for archived partitions, oldest
+    day first, optionally limited to one video and a day range.
+    `columns` maps each field to a NumPy array; see `as_uuids` for the
+    id columns.
+    """
+    directory = str(directory or settings.archive_dir)
+    if not os.path.isdir(directory):
+        return
+    for day_name in sorted(os.listdir(directory)):
+        try:
+            bucket = datetime.date.fromisoformat(day_name)
+        except ValueError:
+            continue
+        if (start is not None and bucket < start) or (end is not None and bucket > end):
+            continue
+        day_dir = os.path.join(directory, day_name)
+        for file_name in sorted(os.listdir(day_dir)):
+            if not file_name.endswith(".npz"):
+                continue
+            archived_host_id = unquote(file_name[:-len(".npz")])
+            if host_id is not None and archived_host_id != host_id:
+                continue
+            yield archived_host_id, bucket, load_archive(os.path.join(day_dir, file_name))
+
+
+def as_uuids(column):
+    return [uuid.UUID(bytes=row.tobytes()) for row in column]
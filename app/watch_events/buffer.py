@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from cassandra.util import unix_time_from_uuid1
+
+from app import db
+from app.config import get_settings
+from app.storage import Batch, Insert, get_storage
+from .models import (
+    WATCH_EVENT_TTL,
+    WatchEvent,
+    WatchPosition,
+    day_bucket,
+    resume_cache,
+    resume_time_for,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+EVENT_COLUMNS = ("host_id", "bucket", "event_id", "user_id", "path",
+                 "start_time", "end_time", "duration", "complete")
+POSITION_COLUMNS = ("user_id", "host_id", "event_id", "path",
+                    "end_time", "duration", "complete")
+
+
+def event_statement():
+    columns = ", ".join(EVENT_COLUMNS)
+    markers = ", ".join("?" for _ in EVENT_COLUMNS)
+    return db.prepare(
+        f"INSERT INTO {WatchEvent.column_family_name()} ({columns}) VALUES ({markers}) USING TTL ?")
+
+
+def event_params(event, ttl=WATCH_EVENT_TTL):
+    return [event.get(col) for col in EVENT_COLUMNS] + [ttl]
+
+
+def position_statement():
+    # Positions are written with the event's own timestamp so a late or
+    # replayed event never overwrites a newer position.
+    columns = ", ".join(POSITION_COLUMNS)
+    markers = ", ".join("?" for _ in POSITION_COLUMNS)
+    return db.prepare(
+        f"INSERT INTO {WatchPosition.column_family_name()} ({columns}) VALUES ({markers}) USING TIMESTAMP ?")
+
+
+def position_timestamp(event):
+    return int(unix_time_from_uuid1(event["event_id"]) * 1e6)
+
+
+def position_params(event):
+    return [event.get(col) for col in POSITION_COLUMNS] + [position_timestamp(event)]
+
+
+def event_insert(event, ttl=WATCH_EVENT_TTL):
+    """`event_statement` as a storage Insert."""
+    return Insert(WatchEvent, {col: event.get(col) for col in EVENT_COLUMNS}, ttl=ttl)
+
+
+def position_insert(event):
+    """`position_statement` as a storage Insert."""
+    return Insert(WatchPosition, {col: event.get(col) for col in POSITION_COLUMNS},
+                  timestamp=position_timestamp(event))
+
+
+class WatchEventBuffer:
+    """
+    Write-behind buffer for watch heartbeats.
+
+    Players report their position every few seconds and each report
+    supersedes the previous one, so only the latest event per
+    (user_id, host_id) is kept in memory. Pending events are written
+    every `flush_interval` seconds, or sooner once `flush_size` viewers
+    are pending, as unlogged batches grouped by partition. Every event
+    also upserts the viewer's `WatchPosition`.
+    """
+
+    def __init__(self,
+                 flush_interval=settings.watch_event_flush_interval,
+                 flush_size=settings.watch_event_flush_size,
+                 batch_size=settings.watch_event_batch_size):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.batch_size = batch_size
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._received = 0
+        self._coalesced = 0
+        self._written = 0
+        self._failed = 0
+        self._flushes = 0
+        self._last_flush_latency = 0.0
+        self._max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+    @property
+    def depth(self):
+        return len(self._pending)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="watch-event-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher thread and drain whatever is still pending."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def add(self, data):
+        event = dict(data)
+        event["user_id"] = uuid.UUID(str(event["user_id"]))
+        event.setdefault("event_id", uuid.uuid1())
+        event.setdefault("bucket", day_bucket(event["event_id"]))
+        key = (event["user_id"], event["host_id"])
+        with self._lock:
+            self._received += 1
+            if key in self._pending:
+                self._coalesced += 1
+            self._pending[key] = event
+            depth = len(self._pending)
+        resume_cache.set(key, resume_time_for(
+            event.get("end_time"), event.get("duration"), event.get("complete")))
+        if depth >= self.flush_size:
+            self._wakeup.set()
+        return event
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            start = time.perf_counter()
+            try:
+                self._write(pending.values())
+            except Exception:
+                logger.exception("Failed to flush %s watch events", len(pending))
+                with self._lock:
+                    self._failed += len(pending)
+                    # Requeue unless a newer heartbeat arrived meanwhile.
+                    for key, event in pending.items():
+                        self._pending.setdefault(key, event)
+                return 0
+            latency = time.perf_counter() - start
+            with self._lock:
+                self._written += len(pending)
+                self._flushes += 1
+                self._last_flush_latency = latency
+                self._max_flush_latency = max(self._max_flush_latency, latency)
+                self._total_flush_latency += latency
+            return len(pending)
+
+    def stats(self):
+        with self._lock:
+            flushes = self._flushes
+            return {
+                "depth": len(self._pending),
+                "received": self._received,
+                "coalesced": self._coalesced,
+                "written": self._written,
+                "failed": self._failed,
+                "flushes": flushes,
+                "last_flush_latency": self._last_flush_latency,
+                "max_flush_latency": self._max_flush_latency,
+                "avg_flush_latency": self._total_flush_latency / flushes if flushes else 0.0,
+            }
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _write(self, events):
+        partitions = defaultdict(list)
+        for event in events:
+            partitions[("event", event["host_id"], event["bucket"])].append(event_insert(event))
+            partitions[("position", event["user_id"])].append(position_insert(event))
+        storage = get_storage()
+        futures = []
+        for rows in partitions.values():
+            for i in range(0, len(rows), self.batch_size):
+                futures.append(storage.execute_async(
+                    Batch(rows[i:i + self.batch_size], logged=False),
+                    execution_profile=db.EXEC_PROFILE_HEARTBEAT))
+        for future in futures:
+            future.result()
+
+
+watch_event_buffer = WatchEventBuffer()
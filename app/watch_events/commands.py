@@ -0,0 +1,128 @@
+import argparse
+import time
+
+from cassandra.concurrent import execute_concurrent_with_args
+from cassandra.cqlengine import connection
+from cassandra.query import SimpleStatement
+from cassandra.util import unix_time_from_uuid1
+
+from app import db
+from app.config import get_settings
+from .archive import archive_buckets
+from .buffer import event_params, event_statement, position_params, position_statement
+from .models import WATCH_EVENT_TTL, WatchEvent, day_bucket
+
+settings = get_settings()
+
+
+def backfill_positions(fetch_size=1000, concurrency=50):
+    """
+    Build `WatchPosition` rows from the existing `WatchEvent` table.
+
+    Events are streamed partition by partition; within a partition they
+    are ordered newest first, so only the first event seen for a user is
+    written. Writes carry the event timestamp, so across day buckets the
+    newest event wins and positions recorded by live traffic are never
+    clobbered.
+    """
+    session = connection.get_session()
+    stmt = position_statement()
+    current_partition = None
+    seen = set()
+    pending = []
+    written = 0
+
+    def write(rows):
+        execute_concurrent_with_args(
+            session, stmt, rows, concurrency=concurrency, raise_on_first_error=True)
+
+    # cqlengine stops at 10,000 rows unless the limit is lifted.
+    for obj in WatchEvent.objects.all().limit(None).fetch_size(fetch_size):
+        if (obj.host_id, obj.bucket) != current_partition:
+            current_partition = (obj.host_id, obj.bucket)
+            seen = set()
+        if obj.user_id in seen:
+            continue
+        seen.add(obj.user_id)
+        pending.append(position_params({
+            "user_id": obj.user_id,
+            "host_id": obj.host_id,
+            "event_id": obj.event_id,
+            "path": obj.path,
+            "end_time": obj.end_time,
+            "duration": obj.duration,
+            "complete": obj.complete,
+        }))
+        if len(pending) >= fetch_size:
+            write(pending)
+            written += len(pending)
+            pending = []
+    if pending:
+        write(pending)
+        written += len(pending)
+    return written
+
+
+def copy_legacy_events(fetch_size=1000, concurrency=50):
+    """
+    Copy rows from the old host_id-partitioned `watch_event` table into
+    the day-bucketed table, keeping only the TTL they have left.
+    """
+    session = connection.get_session()
+    stmt = event_statement()
+    query = SimpleStatement(
+        f"SELECT host_id, event_id, user_id, path, start_time, end_time, duration, complete "
+        f"FROM {settings.keyspace}.watch_event", fetch_size=fetch_size)
+    now = time.time()
+    pending = []
+    copied = 0
+    for row in session.execute(query, execution_profile=db.EXEC_PROFILE_SCAN):
+        ttl = WATCH_EVENT_TTL
+        if ttl:
+            ttl -= int(now - unix_time_from_uuid1(row["event_id"]))
+            if ttl <= 0:
+                continue
+        row["bucket"] = day_bucket(row["event_id"])
+        pending.append(event_params(row, ttl=ttl))
+        if len(pending) >= fetch_size:
+            execute_concurrent_with_args(
+                session, stmt, pending, concurrency=concurrency, raise_on_first_error=True)
+            copied += len(pending)
+            pending = []
+    if pending:
+        execute_concurrent_with_args(
+            session, stmt, pending, concurrency=concurrency, raise_on_first_error=True)
+        copied += len(pending)
+    return copied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.watch_events.commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill = subparsers.add_parser(
+        "backfill_positions", help="Build watch positions from watch events")
+    backfill.add_argument("--fetch-size", type=int, default=1000)
+    copy_legacy = subparsers.add_parser(
+        "copy_legacy_events", help="Copy events from the old watch_event table")
+    copy_legacy.add_argument("--fetch-size", type=int, default=1000)
+    subparsers.add_parser(
+        "archive", help="Archive closed day buckets to compressed files")
+    args = parser.parse_args(argv)
+
+    db.get_session()
+    try:
+        if args.command == "backfill_positions":
+            written = backfill_positions(fetch_size=args.fetch_size)
+            print(f"Backfilled {written} watch positions")
+        elif args.command == "copy_legacy_events":
+            copied = copy_legacy_events(fetch_size=args.fetch_size)
+            print(f"Copied {copied} watch events")
+        elif args.command == "archive":
+            archived = archive_buckets()
+            print(f"Archived {archived} day buckets to {settings.archive_dir}")
+    finally:
+        db.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,66 @@
+import datetime
 import uuid
 from cassandra.cqlengine import columns
 from cassandra.cqlengine.models import Model
+from cassandra.util import unix_time_from_uuid1
 
+from app.cache import LRUCache
 from app.config import get_settings
+from app.storage import get_storage
 
 settings = get_settings()
 
+# Fraction of the duration past which a view counts as completed.
+COMPLETION_THRESHOLD = 0.97
+
+WATCH_EVENT_TTL = settings.watch_event_ttl_days * 86400
+
+resume_cache = LRUCache(maxsize=settings.resume_cache_size,
+                        ttl=settings.resume_cache_ttl)
+
+
+def resume_time_for(end_time, duration, complete=False):
+    if end_time is None:
+        return 0
+    completed = duration is not None and duration * COMPLETION_THRESHOLD < end_time
+    if complete and completed:
+        return 0
+    return end_time
+
+
+def watched_fraction(end_time, duration, complete=False):
+    """How much of a video a position covers, from 0 to 1."""
+    if end_time is None or not duration:
+        return 0.0
+    if complete and duration * COMPLETION_THRESHOLD < end_time:
+        return 1.0
+    return min(max(end_time / duration, 0.0), 1.0)
+
+
+def day_bucket(event_id):
+    return datetime.datetime.utcfromtimestamp(unix_time_from_uuid1(event_id)).date()
+
+
+def day_buckets(start, end):
+    """Day buckets from `end` back to `start`, newest first."""
+    day = end
+    while day >= start:
+        yield day
+        day -= datetime.timedelta(days=1)
+
 
 class WatchEvent(Model):
+    """
+    Raw watch heartbeats, partitioned by video and UTC day so no
+    partition grows without bound. Rows expire after
+    `watch_event_ttl_days`; `archive.archive_buckets` keeps a compressed
+    copy of each day on disk before it does.
+    """
     __keyspace__ = settings.keyspace
-    host_id = columns.Text(primary_key=True)
+    __table_name__ = "watch_event_by_day"
+    __options__ = {"default_time_to_live": WATCH_EVENT_TTL}
+    host_id = columns.Text(partition_key=True)
+    bucket = columns.Date(partition_key=True)
     event_id = columns.TimeUUID(
         primary_key=True, clustering_order="DESC", default=uuid.uuid1)
     user_id = columns.UUID(primary_key=True)
@@ -21,14 +72,44 @@ class WatchEvent(Model):
 
     @property
     def completed(self):
-        return self.duration * 0.97 < self.end_time
+        return self.duration * COMPLETION_THRESHOLD < self.end_time
+
+    @staticmethod
+    def get_resume_time(host_id, user_id):
+        return WatchPosition.get_resume_time(host_id, user_id)
+
+
+class WatchPosition(Model):
+    """
+    Last known playback position of a user on a video.
+
+    Upserted alongside every `WatchEvent` so the resume time is a
+    single point read instead of a scan of the video's events.
+    """
+    __keyspace__ = settings.keyspace
+    user_id = columns.UUID(primary_key=True)
+    host_id = columns.Text(primary_key=True)
+    event_id = columns.TimeUUID()
+    path = columns.Text()
+    end_time = columns.Double()
+    duration = columns.Double()
+    complete = columns.Boolean(default=False)
+
+    @property
+    def resume_time(self):
+        return resume_time_for(self.end_time, self.duration, self.complete)
+
+    @property
+    def watched_fraction(self):
+        return watched_fraction(self.end_time, self.duration, self.complete)
 
     @staticmethod
     def get_resume_time(host_id, user_id):
-        resume_time = 0
-        obj = WatchEvent.objects.allow_filtering().filter(
-            host_id=host_id, user_id=user_id).first()
-        if obj is not None:
-            if not obj.complete or not obj.completed:
-                resume_time = obj.end_time
+        user_id = uuid.UUID(str(user_id))
+        key = (user_id, host_id)
+        resume_time = resume_cache.get(key)
+        if resume_time is None:
+            obj = get_storage().get(WatchPosition, user_id=user_id, host_id=host_id)
+            resume_time = obj.resume_time if obj is not None else 0
+            resume_cache.set(key, resume_time)
         return resume_time
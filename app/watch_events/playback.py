@@ -0,0 +1,75 @@
+import math
+import time
+
+from app.config import get_settings
+from .buffer import watch_event_buffer
+from .models import COMPLETION_THRESHOLD
+
+settings = get_settings()
+
+TICK = "t"
+PAUSE = "p"
+END = "e"
+DURATION = "d"
+
+
+class PlaybackSession:
+    """
+    Latest playback state of one WebSocket connection.
+
+    The player sends compact "<state>:<seconds>" frames, e.g. "t:12.5".
+    Ticks only move the position in memory; pause, end, disconnect or
+    `persist_interval` seconds without a save hand the position to the
+    watch event buffer.
+    """
+
+    def __init__(self, user_id, host_id, start_time=0.0, duration=0.0, path=None,
+                 persist_interval=settings.watch_socket_persist_interval):
+        self.user_id = user_id
+        self.host_id = host_id
+        self.start_time = start_time
+        self.duration = duration
+        self.path = path
+        self.persist_interval = persist_interval
+        self.position = start_time
+        self.complete = False
+        self.dirty = False
+        self.last_persisted = time.monotonic()
+
+    def update(self, message):
+        state, _, value = message.partition(":")
+        try:
+            value = float(value)
+        except ValueError:
+            return
+        if not math.isfinite(value):
+            return
+        if state == DURATION:
+            self.duration = value
+            return
+        if state not in (TICK, PAUSE, END):
+            return
+        self.position = value
+        self.dirty = True
+        if state == END:
+            self.complete = True
+        if state in (PAUSE, END) or time.monotonic() - self.last_persisted >= self.persist_interval:
+            self.persist()
+
+    def persist(self):
+        if not self.dirty:
+            return None
+        complete = self.complete or (
+            self.duration > 0 and self.duration * COMPLETION_THRESHOLD < self.position)
+        event = watch_event_buffer.add({
+            "host_id": self.host_id,
+            "user_id": self.user_id,
+            "path": self.path,
+            "start_time": self.start_time,
+            "end_time": self.position,
+            "duration": self.duration,
+            "complete": complete,
+        })
+        self.dirty = False
+        self.last_persisted = time.monotonic()
+        return event
@@ -1,19 +1,64 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, WebSocket, status
+from pydantic.error_wrappers import ValidationError
 
-from .models import WatchEvent
-from .schemas import WatchEventSchema
+from app.users.decorators import login_required
+from .buffer import watch_event_buffer
+from .playback import PlaybackSession
+from .schemas import WatchEventSchema, WatchSessionSchema
 
 router = APIRouter()
 
 
 @router.post("/api/events/watch", response_model=WatchEventSchema)
-def watch_event_view(request: Request, watch_event: WatchEventSchema):
+async def watch_event_view(request: Request, watch_event: WatchEventSchema):
     if request.user.is_authenticated:
         cleaned_data = watch_event.dict()
         data = cleaned_data.copy()
         data.update({
             "user_id": request.user.username
         })
-        WatchEvent.objects.create(**data)
+        watch_event_buffer.add(data)
         return watch_event
     return watch_event
+
+
+async def _receive_text(websocket: WebSocket):
+    """The next text frame, skipping binary ones; None once the client is gone."""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return None
+        if message.get("text") is not None:
+            return message["text"]
+
+
+@router.websocket("/ws/events/watch")
+async def watch_event_socket(websocket: WebSocket):
+    if not websocket.user.is_authenticated:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    text = await _receive_text(websocket)
+    if text is None:
+        return
+    try:
+        session_data = WatchSessionSchema.parse_raw(text)
+    except ValidationError:
+        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+        return
+    playback = PlaybackSession(
+        user_id=websocket.user.username, **session_data.dict())
+    try:
+        while True:
+            text = await _receive_text(websocket)
+            if text is None:
+                break
+            playback.update(text)
+    finally:
+        playback.persist()
+
+
+@router.get("/api/events/watch/stats")
+@login_required
+def watch_event_stats_view(request: Request):
+    return watch_event_buffer.stats()
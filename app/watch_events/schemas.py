@@ -12,3 +12,10 @@ class WatchEventSchema(BaseModel):
     duration: float
     complete: bool
     path: Optional[str]
+
+
+class WatchSessionSchema(BaseModel):
+    host_id: str
+    start_time: float = 0
+    duration: float = 0
+    path: Optional[str]
@@ -0,0 +1,65 @@
+"""
+Concurrency benchmark: the async repository against cqlengine calls on
+the Starlette threadpool, for the video lookup of `video_detail_view`.
+
+    python -m benchmarks.bench_async_reads --host-id <host_id> --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app import db, repository
+from app.videos.models import Video, video_cache
+
+
+def threadpool_get(host_id):
+    return Video.objects.filter(host_id=host_id).first()
+
+
+async def run(label, fetch, host_id, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(host_id)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<12} {requests / elapsed:>10.0f} req/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms")
+
+
+async def main(host_id, requests, concurrency):
+    async def threadpool(host_id):
+        return await run_in_threadpool(threadpool_get, host_id)
+
+    # Both sides must hit the database: with the cache on, the async
+    # lookups would be served from memory.
+    video_cache.maxsize = 0
+    video_cache.clear()
+    # Warm up prepared statements and connections before measuring.
+    await repository.get_video(host_id)
+    threadpool_get(host_id)
+    await run("threadpool", threadpool, host_id, requests, concurrency)
+    await run("async", repository.get_video, host_id, requests, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host-id", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    session = db.get_session()
+    try:
+        asyncio.run(main(args.host_id, args.requests, args.concurrency))
+    finally:
+        session.cluster.shutdown()
@@ -0,0 +1,275 @@
+"""
+Latency and throughput of the hot endpoints. The ASGI app runs in
+process on the in-memory storage backend, or a server started with
+STORAGE_BACKEND=memory is driven over HTTP with --url. Users, videos and
+playlists are created through the app itself before the runs.
+
+    python -m benchmarks.bench_endpoints
+    python -m benchmarks.bench_endpoints --latency 2 --save-baseline
+    python -m benchmarks.bench_endpoints --url http://127.0.0.1:8000
+
+Every scenario reports p50/p95/p99 latency and throughput, and is
+compared with the baseline JSON recorded with the same parameters: the
+run fails when a scenario's p95 grows, or its throughput drops, by more
+than --threshold, or when any request fails. A baseline from another
+machine or Python version is still compared, with a warning, and
+--save-baseline refuses to record a run with failed requests.
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from app.storage import set_storage
+from app.storage.memory import MemoryStorage
+
+BASELINE = Path(__file__).resolve().parent / "baselines" / "endpoints.json"
+PASSWORD = "bench-password-1"
+# Parameters a baseline is only comparable under.
+PARAMETERS = ("requests", "login_requests", "concurrency", "viewers", "sizes", "videos", "users",
+              "latency", "jitter", "url")
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted `values`."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def summarize(latencies, errors, elapsed, concurrency):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "p50": percentile(latencies, 0.50) * 1000,
+        "p95": percentile(latencies, 0.95) * 1000,
+        "p99": percentile(latencies, 0.99) * 1000,
+        "throughput": len(latencies) / elapsed,
+    }
+
+
+async def measure(request, count, concurrency, warmup=10):
+    """Run `request(i)` `count` times from `concurrency` workers."""
+    for i in range(warmup):
+        await request(i)
+    pending = iter(range(count))
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for i in pending:
+            start = time.perf_counter()
+            try:
+                ok = await request(i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start, concurrency)
+
+
+def synthetic_host_ids(count, seed=0):
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "-_"
+    return ["".join(rng.choices(alphabet, k=11)) for _ in range(count)]
+
+
+async def seed(client_factory, users, videos, sizes):
+    """
+    Sign up and log in `users` clients; the first one adds `videos`
+    videos and one playlist per size. Returns the clients, the host ids
+    and `{size: playlist_id}`.
+    """
+    clients = []
+    for n in range(users):
+        client = client_factory()
+        email = f"bench-{n}-{time.time_ns()}@example.com"
+        await client.post("/signup", data={"email": email, "password": PASSWORD,
+                                           "password_confirm": PASSWORD})
+        response = await client.post("/login", data={"email": email, "password": PASSWORD})
+        if "session_id" not in client.cookies:
+            raise SystemExit(f"Could not log in as {email}: {response.status_code}")
+        clients.append((client, email))
+    owner = clients[0][0]
+    host_ids = synthetic_host_ids(videos)
+    await import_videos(owner, host_ids)
+    playlists = {}
+    for size in sizes:
+        response = await owner.post("/playlists/create", data={"title": f"Bench {size}"})
+        playlist_id = response.headers["location"].rsplit("/", 1)[-1]
+        await import_videos(owner, host_ids[:size], playlist_id)
+        playlists[size] = playlist_id
+    return clients, host_ids, playlists
+
+
+async def import_videos(client, host_ids, playlist_id=None):
+    rows = "\n".join(f"https://youtu.be/{host_id},Benchmark video {host_id}" for host_id in host_ids)
+    data = {"playlist_id": playlist_id} if playlist_id else {}
+    response = await client.post("/videos/import", files={"file": ("videos.csv", "url,title\n" + rows)},
+                                 data=data, timeout=None)
+    summary = json.loads(response.text.strip().splitlines()[-1])
+    if summary.get("summary", {}).get("error"):
+        raise SystemExit(f"Seeding failed: {summary}")
+
+
+async def run(args, client_factory):
+    clients, host_ids, playlists = await seed(client_factory, args.users, args.videos, args.sizes)
+    anonymous = client_factory()
+    rng = random.Random(2)
+
+    def user(i):
+        return clients[i % len(clients)]
+
+    async def login(i):
+        _, email = user(i)
+        response = await anonymous.post("/login", data={"email": email, "password": PASSWORD})
+        return response.status_code == 302
+
+    async def video_detail(i):
+        response = await user(i)[0].get(f"/videos/{rng.choice(host_ids)}")
+        return response.status_code == 200
+
+    def heartbeat(viewers):
+        async def request(i):
+            viewer = i % viewers
+            host_id = host_ids[viewer % len(host_ids)]
+            response = await user(viewer)[0].post("/api/events/watch", json={
+                "host_id": host_id, "path": f"/videos/{host_id}",
+                "start_time": 0, "end_time": float(i // viewers * 5), "duration": 600.0,
+                "complete": False})
+            return response.status_code == 200
+        return request
+
+    def get(path, client=None):
+        async def request(i):
+            response = await (client or user(i)[0]).get(path)
+            return response.status_code == 200
+        return request
+
+    scenarios = [("login", login, args.login_requests, args.concurrency),
+                 ("video_detail", video_detail, args.requests, args.concurrency)]
+    scenarios += [(f"watch_heartbeat_{viewers}", heartbeat(viewers), max(args.requests, viewers), viewers)
+                  for viewers in args.viewers]
+    scenarios += [(f"playlist_detail_{size}", get(f"/playlists/{playlists[size]}"),
+                   args.requests, args.concurrency) for size in args.sizes]
+    scenarios += [
+        ("video_list", get("/videos/", anonymous), args.requests, args.concurrency),
+        ("playlist_list", get("/playlists/", anonymous), args.requests, args.concurrency),
+        ("dashboard_videos", get("/dashboard/videos"), args.requests, args.concurrency),
+    ]
+    results = {}
+    for name, request, count, concurrency in scenarios:
+        if args.only and name not in args.only:
+            continue
+        results[name] = await measure(request, count, concurrency)
+        report(name, results[name])
+    return results
+
+
+def report(name, result):
+    print(f"{name:<24} {result['requests']:>6} {result['errors']:>6} "
+          f"{result['p50']:>9.2f} {result['p95']:>9.2f} {result['p99']:>9.2f} "
+          f"{result['throughput']:>9.1f}", flush=True)
+
+
+def compare(results, baseline, threshold):
+    """Names and reasons of the scenarios that regressed against `baseline`."""
+    failures = []
+    for name, result in results.items():
+        if result["errors"]:
+            failures.append((name, f"{result['errors']} failed requests"))
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["p95"] > before["p95"] * (1 + threshold):
+            failures.append((name, f"p95 {before['p95']:.2f} -> {result['p95']:.2f} ms"))
+        if result["throughput"] < before["throughput"] / (1 + threshold):
+            failures.append((name, f"throughput {before['throughput']:.1f} -> "
+                                   f"{result['throughput']:.1f} req/s"))
+    return failures
+
+
+async def main(args):
+    parameters = {name: getattr(args, name) for name in PARAMETERS}
+    print(f"{'scenario':<24} {'reqs':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'req/s':>9}")
+    if args.url:
+        def client_factory():
+            return httpx.AsyncClient(base_url=args.url, timeout=60)
+        results = await run(args, client_factory)
+    else:
+        from app.main import app
+        set_storage(MemoryStorage(latency=args.latency / 1000, jitter=args.jitter / 1000))
+
+        def client_factory():
+            return httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                     base_url="http://testserver", timeout=60)
+        await app.router.startup()
+        try:
+            results = await run(args, client_factory)
+        finally:
+            await app.router.shutdown()
+
+    environment = {"python": platform.python_version(), "machine": platform.platform()}
+    if args.save_baseline:
+        failed = [name for name, result in results.items() if result["errors"]]
+        if failed:
+            print(f"not saving a baseline with failed requests in {', '.join(failed)}")
+            return 1
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({
+            "parameters": parameters,
+            **environment,
+            "scenarios": results,
+        }, indent=2) + "\n")
+        print(f"saved baseline to {args.baseline}")
+        return 0
+    baseline = {}
+    if args.baseline.exists():
+        recorded = json.loads(args.baseline.read_text())
+        if recorded["parameters"] == parameters:
+            baseline = recorded["scenarios"]
+            for name, value in environment.items():
+                if recorded.get(name) != value:
+                    print(f"warning: {args.baseline} was recorded on {name} {recorded.get(name)}, "
+                          f"this is {value}; timings may not be comparable")
+        else:
+            print(f"{args.baseline} was recorded with other parameters; only checking for errors")
+    failures = compare(results, baseline, args.threshold)
+    for name, reason in failures:
+        print(f"REGRESSION {name}: {reason}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Benchmark a running server instead of the app in process")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--viewers", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--videos", type=int, default=500)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Simulated storage latency per request, in ms")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, in ms")
+    parser.add_argument("--only", nargs="+", help="Run only these scenarios")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                        help="Allowed relative regression, 0.3 is 30%%")
+    args = parser.parse_args()
+    args.videos = max([args.videos, *args.sizes])
+    sys.exit(asyncio.run(main(args)))
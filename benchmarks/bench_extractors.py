@@ -0,0 +1,53 @@
+"""
+Micro-benchmark of URL parsing: the registry in `app.videos.extractors`
+against the original urlparse/parse_qs implementation.
+
+    python -m benchmarks.bench_extractors --number 200000
+"""
+import argparse
+import timeit
+from urllib.parse import parse_qs, urlparse
+
+from app.videos.extractors import extract
+
+URLS = [
+    "https://www.youtube.com/watch?v=KQ-u4RcFLBY",
+    "http://www.youtube.com/watch?v=nNpvWBuTfrc&feature=feedu",
+    "https://youtu.be/nNpvWBuTfrc",
+    "http://www.youtube.com/embed/nNpvWBuTfrc",
+    "http://www.youtube.com/v/nNpvWBuTfrc?version=3&amp;hl=en_US",
+    "https://example.com/not-a-video",
+]
+
+
+def legacy_extract_video_id(url):
+    query = urlparse(url)
+    if query.hostname == "youtu.be":
+        return query.path[1:]
+    if query.hostname in {"www.youtube.com", "youtube.com"}:
+        if query.path == "/watch":
+            return parse_qs(query.query)["v"][0]
+        if query.path[:7] == "/watch/":
+            return query.path.split("/")[1]
+        if query.path[:7] == "/embed/":
+            return query.path.split("/")[2]
+        if query.path[:3] == "/v/":
+            return query.path.split("/")[2]
+    return None
+
+
+def main(number):
+    for label, func in (("legacy", legacy_extract_video_id), ("registry", extract)):
+        def run():
+            for url in URLS:
+                func(url)
+        elapsed = min(timeit.repeat(run, number=number // len(URLS), repeat=5))
+        calls = number // len(URLS) * len(URLS)
+        print(f"{label:<10} {calls / elapsed:>12.0f} urls/s   {elapsed / calls * 1e9:7.0f} ns/url")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.number)
@@ -0,0 +1,70 @@
+"""
+Time to load the videos of a playlist: one read after another (the old
+`Playlist.get_videos`) against the concurrent sync and async batches.
+The video cache is cleared before every run so each one hits Cassandra.
+
+    python -m benchmarks.bench_playlist_videos --sizes 10 50 200 500 --repeat 5
+"""
+import argparse
+import asyncio
+import itertools
+import time
+
+from app import db, repository
+from app.videos.models import Video, video_cache
+
+
+def sequential(host_ids):
+    videos = []
+    for host_id in host_ids:
+        try:
+            video_obj = Video.objects.get(host_id=host_id)
+        except Exception:
+            video_obj = None
+        if video_obj is not None:
+            videos.append(video_obj)
+    return videos
+
+
+def timed(func, host_ids, repeat):
+    best = None
+    for _ in range(repeat):
+        video_cache.clear()
+        start = time.perf_counter()
+        func(host_ids)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main(sizes, repeat):
+    known = list(Video.objects.all().limit(max(sizes)).values_list("host_id", flat=True))
+    if not known:
+        raise SystemExit("The videos table is empty")
+    loop = asyncio.new_event_loop()
+    # Warm up prepared statements and connections.
+    Video.get_many(known[:1])
+    loop.run_until_complete(repository.get_videos(known[:1]))
+    print(f"{'size':>6} {'sequential':>12} {'concurrent':>12} {'async':>12}")
+    for size in sizes:
+        # Repeat the known ids so every size keeps its duplicates.
+        host_ids = list(itertools.islice(itertools.cycle(known), size))
+        results = [
+            timed(sequential, host_ids, repeat),
+            timed(Video.get_many, host_ids, repeat),
+            timed(lambda ids: loop.run_until_complete(repository.get_videos(ids)), host_ids, repeat),
+        ]
+        print(f"{size:>6} " + " ".join(f"{ms:>9.1f} ms" for ms in results))
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200, 500])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    session = db.get_session()
+    try:
+        main(args.sizes, args.repeat)
+    finally:
+        session.cluster.shutdown()
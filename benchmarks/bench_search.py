@@ -0,0 +1,69 @@
+"""
+Memory and query latency of the video search index on synthetic titles.
+The build time includes tracemalloc overhead.
+
+    python -m benchmarks.bench_search --videos 100000 --queries 2000
+"""
+import argparse
+import random
+import string
+import time
+import tracemalloc
+
+from app.videos.search import VideoSearchIndex
+
+WORDS = [
+    "python", "tutorial", "beginners", "advanced", "music", "live", "official", "video",
+    "review", "guide", "how", "to", "build", "react", "django", "fastapi", "cassandra",
+    "cooking", "travel", "vlog", "news", "highlights", "game", "trailer", "remix",
+]
+
+
+def synthetic_videos(count, seed=0):
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits + "-_"
+    vocabulary = WORDS + ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+                          for _ in range(20000)]
+    for _ in range(count):
+        host_id = "".join(rng.choices(alphabet, k=11))
+        title = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 9)))
+        yield host_id, title.capitalize()
+
+
+def main(videos, queries):
+    rows = list(synthetic_videos(videos))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    index = VideoSearchIndex()
+    index.load(rows)
+    build_time = time.perf_counter() - start
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    stats = index.stats()
+    print(f"built {stats['videos']} videos, {stats['tokens']} tokens in {build_time:.2f} s")
+    print(f"memory {used / 2 ** 20:.1f} MiB total, "
+          f"{used / len(rows) * 100000 / 2 ** 20:.1f} MiB per 100k videos")
+
+    rng = random.Random(1)
+    keystrokes = []
+    for _ in range(queries):
+        word = rng.choice(WORDS)
+        keystrokes.append(word[:rng.randint(1, len(word))])
+    latencies = []
+    for query in keystrokes:
+        start = time.perf_counter()
+        index.search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"typeahead   p50 {p50:7.3f} ms   p99 {p99:7.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.videos, args.queries)
@@ -0,0 +1,50 @@
+"""
+Worker startup cost of the schema step: `sync_table` on every model (the
+old `on_startup`) against the schema version check that replaced it.
+
+    python -m benchmarks.bench_startup --repeat 5
+"""
+import argparse
+import time
+
+from cassandra.cqlengine.management import sync_table
+
+from app import db
+from app.migrations.runner import check_schema_version
+from app.migrations.versions import MIGRATIONS, _models
+
+
+def sync_all():
+    models = _models()
+    for migration in MIGRATIONS:
+        for table in migration.tables:
+            sync_table(models[table])
+
+
+def timed(label, func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{label:<14} median {timings[len(timings) // 2] * 1000:9.1f} ms   "
+          f"max {timings[-1] * 1000:9.1f} ms")
+
+
+def main(repeat):
+    timed("sync_table", sync_all, repeat)
+    timed("version check", check_schema_version, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    session = db.get_session()
+    print(f"{'connect':<14} {(time.perf_counter() - start) * 1000:16.1f} ms")
+    try:
+        main(args.repeat)
+    finally:
+        session.cluster.shutdown()
@@ -0,0 +1,48 @@
+"""
+Detail page latency with and without the video metadata cache.
+
+    python -m benchmarks.bench_video_cache --host-id <host_id> --requests 2000 --concurrency 50
+
+Requests go through the ASGI app in process, so the numbers include
+routing, the session middleware and template rendering.
+"""
+import argparse
+import asyncio
+
+import httpx
+
+from app import db
+from app.main import app
+from app.videos.models import video_cache
+from .bench_async_reads import run
+
+
+async def main(host_id, requests, concurrency):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def detail(host_id):
+            response = await client.get(f"/videos/{host_id}")
+            response.raise_for_status()
+
+        maxsize = video_cache.maxsize
+        # Warm up prepared statements, connections and templates.
+        await detail(host_id)
+        video_cache.maxsize = 0
+        video_cache.clear()
+        await run("uncached", detail, host_id, requests, concurrency)
+        video_cache.maxsize = maxsize
+        video_cache.hits = video_cache.misses = video_cache.evictions = 0
+        await run("cached", detail, host_id, requests, concurrency)
+        print(f"hit rate {video_cache.stats()['hit_rate']:.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host-id", required=True)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    session = db.get_session()
+    try:
+        asyncio.run(main(args.host_id, args.requests, args.concurrency))
+    finally:
+        session.cluster.shutdown()
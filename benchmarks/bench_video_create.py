@@ -0,0 +1,69 @@
+"""
+Latency of adding new videos: the single-pass `Video.get_or_create_video`
+against the previous scan-based path, which is reproduced here.
+
+    python -m benchmarks.bench_video_create --user-id <user_id> --videos 200
+
+Every run creates fresh random host ids and deletes them afterwards.
+"""
+import argparse
+import secrets
+import time
+import uuid
+
+from cassandra.cqlengine.query import DoesNotExist, MultipleObjectsReturned
+
+from app import db
+from app.users.models import User
+from app.videos.models import UserVideo, Video
+
+
+def legacy_get_or_create_video(host_id, user_id, title=None):
+    try:
+        return Video.objects.get(host_id=host_id), False
+    except MultipleObjectsReturned:
+        return Video.objects.allow_filtering().filter(host_id=host_id).first(), False
+    except DoesNotExist:
+        pass
+    if User.objects.filter(user_id=user_id).allow_filtering().count() == 0:
+        raise ValueError("Invalid user_id")
+    q = Video.objects.filter(host_id=host_id, user_id=user_id).allow_filtering()
+    if q.count() != 0:
+        raise ValueError("Video already added")
+    return Video.create(host_id=host_id, user_id=user_id, title=title), True
+
+
+def new_get_or_create_video(host_id, user_id, title=None):
+    return Video.get_or_create_video(
+        f"https://youtu.be/{host_id}", user_id, host_id=host_id, title=title)
+
+
+def run(label, create, user_id, count):
+    host_ids = [f"bench-{secrets.token_urlsafe(8)}" for _ in range(count)]
+    latencies = []
+    try:
+        for host_id in host_ids:
+            start = time.perf_counter()
+            create(host_id, user_id, title=host_id)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        for host_id in host_ids:
+            Video.objects.filter(host_id=host_id).delete()
+            UserVideo.objects.filter(user_id=user_id, host_id=host_id).delete()
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<8} p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   over {count} new videos")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--user-id", type=uuid.UUID, required=True)
+    parser.add_argument("--videos", type=int, default=200)
+    args = parser.parse_args()
+    session = db.get_session()
+    try:
+        run("legacy", legacy_get_or_create_video, args.user_id, args.videos)
+        run("new", new_get_or_create_video, args.user_id, args.videos)
+    finally:
+        session.cluster.shutdown()